@@ -0,0 +1,133 @@
+# Runs one Trader over many rounds/days in parallel and collects the PnL.
+#   python batch.py --trader dontlooseshells_algo:Trader
+#   python batch.py --trader my_algo:Trader --days 1:-1 2:0 --workers 4 --log
+import argparse
+import contextlib
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import pandas as pd
+
+from backtester import simulate_alternative, training_days, load_day
+from market_data import SharedDay, attach_shared_day
+
+
+class BatchJob(NamedTuple):
+    round: int
+    day: int
+    names: bool = True
+    halfway: bool = False
+
+
+def load_trader_class(spec: str):
+    # 'module:Class', the module is imported from the working directory
+    module_name, _, class_name = spec.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name or 'Trader')
+
+
+@contextlib.contextmanager
+def silenced(quiet=True):
+    # the backtester and most traders print a lot, workers drop it
+    if not quiet:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def shared_days(days: list[tuple[int, int, bool]]):
+    # Loads every (round, day, names) once into shared memory and yields
+    # their descriptors, workers attach to them with attach_shared_day
+    blocks = {}
+    try:
+        for key in dict.fromkeys(days):
+            round, day, names = key
+            blocks[key] = SharedDay(*load_day(round, day, names))
+        yield { key: block.descriptor for key, block in blocks.items() }
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+def default_jobs(names=True, halfway=False) -> list[BatchJob]:
+    return [BatchJob(round, day, names, halfway) for round, day in training_days()]
+
+
+def run_job(trader_class, job: BatchJob, time_limit=999900, log=False, quiet=True, shared: dict | None = None) -> pd.DataFrame:
+    # Runs in a worker process, every job gets a fresh Trader.
+    # `shared` is the descriptor of the day in shared memory, if any.
+    trader = trader_class()
+    start = time.perf_counter()
+    data = attach_shared_day(shared) if shared is not None else None
+    with silenced(quiet):
+        ledger = simulate_alternative(job.round, job.day, trader, time_limit, job.names, job.halfway, log=log, data=data)
+    final = ledger.profits[-1] + ledger.balance[-1]
+    return pd.DataFrame({
+        'round': job.round,
+        'day': job.day,
+        'symbol': ledger.symbols,
+        'pnl': final,
+        'seconds': time.perf_counter() - start,
+    })
+
+
+def run_batch(trader_class, jobs: list[BatchJob] | None = None, workers: int | None = None, time_limit=999900, log=False) -> pd.DataFrame:
+    # Returns one row per (round, day, symbol) with the final pnl of that day
+    if jobs is None:
+        jobs = default_jobs()
+    if workers == 1:
+        results = [run_job(trader_class, job, time_limit, log) for job in jobs]
+    else:
+        results = []
+        with shared_days([(job.round, job.day, job.names) for job in jobs]) as descriptors, ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = { pool.submit(run_job, trader_class, job, time_limit, log, True, descriptors[(job.round, job.day, job.names)]): job for job in jobs }
+            for future in as_completed(futures):
+                job = futures[future]
+                results.append(future.result())
+                print(f'round {job.round} day {job.day} done', file=sys.stderr)
+    table = pd.concat(results, ignore_index=True)
+    return table.sort_values(['round', 'day', 'symbol'], ignore_index=True)
+
+
+def summarize(table: pd.DataFrame) -> pd.DataFrame:
+    # days as rows, symbols as columns plus the total
+    pivot = table.pivot_table(index=['round', 'day'], columns='symbol', values='pnl', aggfunc='sum', fill_value=0.0)
+    pivot['TOTAL'] = pivot.sum(axis=1)
+    return pivot
+
+
+def _parse_day(value: str) -> tuple[int, int]:
+    round, _, day = value.partition(':')
+    return int(round), int(day)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a Trader on several training days in parallel.')
+    parser.add_argument('--trader', required=True, help="trader class as 'module:Class'")
+    parser.add_argument('--days', nargs='*', type=_parse_day, help="days as 'round:day', default: all days in the training folder")
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, default: number of cpus')
+    parser.add_argument('--time-limit', type=int, default=999900)
+    parser.add_argument('--no-names', action='store_true', help='use the trades files without bot names')
+    parser.add_argument('--halfway', action='store_true', help='match orders halfway')
+    parser.add_argument('--log', action='store_true', help='write a log file per day to logs/')
+    parser.add_argument('--csv', help='also write the per day/symbol table to this file')
+    args = parser.parse_args()
+
+    trader_class = load_trader_class(args.trader)
+    names = not args.no_names
+    if args.days:
+        jobs = [BatchJob(round, day, names, args.halfway) for round, day in args.days]
+    else:
+        jobs = default_jobs(names, args.halfway)
+    table = run_batch(trader_class, jobs, args.workers, args.time_limit, args.log)
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summarize(table))
+        print(f'\nTotal pnl: {table["pnl"].sum()}')
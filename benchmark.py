@@ -0,0 +1,484 @@
+# Benchmarks for the backtester itself, run with
+#   python benchmark.py
+# only the check of aggregate_orders against the old cleanup, exits with 1 if they differ
+#   python benchmark.py --check
+# and the suite over all stages of a simulation, see run_suite()
+#   python benchmark.py --suite --save-baseline bench_baseline.json
+#   python benchmark.py --suite --compare bench_baseline.json
+import argparse
+import copy
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+from datamodel import *
+from backtester import (TRAINING_DATA_PREFIX, SYMBOLS_BY_ROUND_POSITIONABLE, process_prices, process_trades, training_days,
+                        load_day, clear_order_book, cleanup_order_volumes, calc_mid, trades_position_pnl_run, create_log_file)
+from counterparties import counterparty_pnl
+from ledger import PnLLedger
+from market_data import BookIndex
+from market_data import load_prices, load_trades, DayStates, gc_paused, build_states, add_market_trades
+from matching import aggregate_orders
+
+
+# The row-by-row loader the backtester used before market_data.py,
+# kept here as the reference the fast loader is compared against.
+def iterrows_process_prices(df_prices, round, time_limit) -> dict[int, TradingState]:
+    states = {}
+    for _, row in df_prices.iterrows():
+        time: int = int(row["timestamp"])
+        if time > time_limit:
+            break
+        product: str = row["product"]
+        if states.get(time) == None:
+            states[time] = TradingState(time, {}, {}, {}, {}, {}, {})
+        if product not in states[time].position and product in SYMBOLS_BY_ROUND_POSITIONABLE[round]:
+            states[time].position[product] = 0
+            states[time].own_trades[product] = []
+            states[time].market_trades[product] = []
+        states[time].listings[product] = Listing(product, product, "1")
+        if product == "DOLPHIN_SIGHTINGS":
+            states[time].observations["DOLPHIN_SIGHTINGS"] = row['mid_price']
+        depth = OrderDepth()
+        for level in range(1, 4):
+            if row[f"bid_price_{level}"] > 0:
+                depth.buy_orders[row[f"bid_price_{level}"]] = int(row[f"bid_volume_{level}"])
+        for level in range(1, 4):
+            if row[f"ask_price_{level}"] > 0:
+                depth.sell_orders[row[f"ask_price_{level}"]] = -int(row[f"ask_volume_{level}"])
+        states[time].order_depths[product] = depth
+    return states
+
+def iterrows_process_trades(df_trades, states: dict[int, TradingState], time_limit):
+    for _, trade in df_trades.iterrows():
+        time: int = trade['timestamp']
+        if time > time_limit:
+            break
+        symbol = trade['symbol']
+        if symbol not in states[time].market_trades:
+            states[time].market_trades[symbol] = []
+        states[time].market_trades[symbol].append(Trade(symbol, trade['price'], trade['quantity'], str(trade['buyer']), str(trade['seller']), time))
+    return states
+
+# cleanup_order_volumes before matching.aggregate_orders, compares every
+# order with every other one
+def quadratic_cleanup_order_volumes(org_orders: List[Order]) -> List[Order]:
+    orders = []
+    for order_1 in org_orders:
+        final_order = copy.copy(order_1)
+        for order_2 in org_orders:
+            if order_1.price == order_2.price and order_1.quantity == order_2.quantity:
+               continue 
+            if order_1.price == order_2.price:
+                final_order.quantity += order_2.quantity
+        orders.append(final_order)
+    return orders
+
+# The compressed form of a full-state log line, to check that both outputs
+# of LocalLogger.flush in dontlooseshells_algo.py hold the same data. Lists
+# are sorted, the full state is written with sort_keys and the compressed
+# lists in the order of the dicts they come from.
+def compress_full_line(line: str) -> dict:
+    full = json.loads(line)
+    state = full["state"]
+    trades = lambda by_symbol: sorted([t["symbol"], t["buyer"], t["seller"], t["price"], t["quantity"], t["timestamp"]]
+                                      for symbol_trades in by_symbol.values() for t in symbol_trades)
+    return {
+        "state": {
+            "t": state["timestamp"],
+            "l": sorted([l["symbol"], l["product"], l["denomination"]] for l in state["listings"].values()),
+            "od": { symbol: [depth["buy_orders"], depth["sell_orders"]] for symbol, depth in state["order_depths"].items() },
+            "ot": trades(state["own_trades"]),
+            "mt": trades(state["market_trades"]),
+            "p": state["position"],
+            "o": state["observations"],
+        },
+        "orders": sorted([o["symbol"], o["price"], o["quantity"]] for symbol_orders in full["orders"].values() for o in symbol_orders),
+        "logs": full["logs"],
+    }
+
+def sorted_compact_line(line: str) -> dict:
+    compact = json.loads(line)
+    for key in ("l", "ot", "mt"):
+        compact["state"][key] = sorted(compact["state"][key])
+    compact["orders"] = sorted(compact["orders"])
+    return compact
+
+def _plain(o):
+    # Turns states into nested builtins, so two loaders can be compared with ==
+    if isinstance(o, dict):
+        return [(k, _plain(v)) for k, v in o.items()]
+    if isinstance(o, list):
+        return [_plain(v) for v in o]
+    if hasattr(o, '__dict__') or hasattr(o, '__slots__'):
+        return _plain(fields(o))
+    return o
+
+def _best_of(repeat: int, fn):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_loader(time_limit=999900, repeat=3):
+    print(f'{"file":<28}{"rows":>8}{"iterrows (s)":>15}{"vectorized (s)":>16}{"speedup":>9}  same')
+    for round, day in training_days():
+        df_prices = pd.read_csv(os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv'), sep=';')
+        df_trades = pd.read_csv(os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv'), sep=';', dtype={ 'seller': str, 'buyer': str })
+        old_time, old_states = _best_of(1, lambda: iterrows_process_trades(df_trades, iterrows_process_prices(df_prices, round, time_limit), time_limit))
+        new_time, new_states = _best_of(repeat, lambda: process_trades(df_trades, process_prices(df_prices, round, time_limit), time_limit))
+        same = _plain(old_states) == _plain(new_states)
+        rows = len(df_prices) + len(df_trades)
+        print(f'{f"round {round} day {day}":<28}{rows:>8}{old_time:>15.3f}{new_time:>16.3f}{old_time / new_time:>8.1f}x  {same}')
+
+def bench_cache(repeat=5):
+    print(f'{"file":<28}{"csv (s)":>10}{"cached (s)":>12}{"speedup":>9}')
+    for round, day in training_days():
+        prices_path = os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv')
+        trades_path = os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv')
+        csv_time, _ = _best_of(repeat, lambda: (load_prices(prices_path, use_cache=False), load_trades(trades_path, use_cache=False)))
+        # first call fills the cache
+        load_prices(prices_path), load_trades(trades_path)
+        cached_time, _ = _best_of(repeat, lambda: (load_prices(prices_path), load_trades(trades_path)))
+        print(f'{f"round {round} day {day}":<28}{csv_time:>10.4f}{cached_time:>12.4f}{csv_time / cached_time:>8.1f}x')
+
+def random_ladder(rng: random.Random, n: int, degenerate=False) -> list[Order]:
+    # A quoting ladder around 10000. Without `degenerate`, every price is
+    # only used by one side and no two orders share price and quantity,
+    # which is the case the old cleanup handled correctly.
+    orders = []
+    used = set()
+    while len(orders) < n:
+        buy = rng.random() < 0.5
+        price = rng.randint(9980, 9999) if buy else rng.randint(10001, 10020)
+        if degenerate and rng.random() < 0.3:
+            price = 10000
+        quantity = rng.randint(1, 20) * (1 if buy else -1)
+        if not degenerate and (price, quantity) in used:
+            continue
+        used.add((price, quantity))
+        orders.append(Order('PEARLS', price, quantity))
+    return orders
+
+def _volume_by_price(orders: list[Order]) -> dict[int, int]:
+    return { order.price: order.quantity for order in orders }
+
+def check_aggregate_orders(cases=2000, seed=0) -> bool:
+    # property: on non-degenerate ladders both give the same volume per price
+    rng = random.Random(seed)
+    for _ in range(cases):
+        orders = random_ladder(rng, rng.randint(1, 40))
+        old = _volume_by_price(quadratic_cleanup_order_volumes(orders))
+        new = aggregate_orders(orders)
+        if old != _volume_by_price(new) or len(new) != len(old) or sum(o.quantity for o in new) != sum(o.quantity for o in orders):
+            print(f'aggregate_orders differs from the quadratic cleanup on {orders}')
+            return False
+    print(f'aggregate_orders matches the quadratic cleanup on {cases} random ladders')
+    return True
+
+def bench_aggregate_orders(sizes=(5, 20, 40), repeat=2000, seed=0):
+    rng = random.Random(seed)
+    print(f'{"orders":>8}{"quadratic (us)":>16}{"single pass (us)":>18}{"speedup":>9}')
+    for n in sizes:
+        ladders = [random_ladder(rng, n) for _ in range(50)]
+        old_time, _ = _best_of(3, lambda: [quadratic_cleanup_order_volumes(l) for l in ladders for _ in range(repeat // 50)])
+        new_time, _ = _best_of(3, lambda: [aggregate_orders(l) for l in ladders for _ in range(repeat // 50)])
+        print(f'{n:>8}{old_time / repeat * 1e6:>16.2f}{new_time / repeat * 1e6:>18.2f}{old_time / new_time:>8.1f}x')
+
+def bench_serializer(round=2, day=0, repeat=3):
+    # one log line per timestamp of a full day, with a few orders per step,
+    # through LocalLogger.flush and take() like a local run
+    from dontlooseshells_algo import LocalLogger
+
+    prices = load_prices(os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv'))
+    trades = load_trades(os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv'))
+    states = list(DayStates(prices, trades, SYMBOLS_BY_ROUND_POSITIONABLE[round]).values())
+    orders = [{ symbol: [Order(symbol, max(depth.buy_orders), 2), Order(symbol, min(depth.sell_orders), -2)]
+                for symbol, depth in state.order_depths.items() if depth.buy_orders and depth.sell_orders } for state in states]
+    full, compact = LocalLogger(local=True), LocalLogger(local=True, compact=True)
+
+    def lines(logger: LocalLogger, logs='') -> list[str]:
+        taken = []
+        for state, step_orders in zip(states, orders):
+            logger.print(logs)
+            logger.flush(state, step_orders)
+            taken.append(logger.take(state.timestamp))
+        return taken
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for full_line, compact_line in zip(lines(full, 'logs'), lines(compact, 'logs')):
+            assert compress_full_line(full_line) == sorted_compact_line(compact_line)
+    print(f'{"LocalLogger.flush":<34}{"day (s)":>10}{"per line (us)":>15}{"speedup":>9}')
+    base = None
+    for name, logger in (('full state', full), ('compact=True', compact)):
+        # the whole day is alive here, a simulation only keeps a few states
+        with gc_paused(), open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            seconds, _ = _best_of(repeat, lambda: lines(logger))
+        base = base or seconds
+        print(f'{name:<34}{seconds:>10.3f}{seconds / len(states) * 1e6:>15.1f}{base / seconds:>8.1f}x')
+
+def _traced_bytes(build) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+def bench_datamodel(round=2, day=0, repeat=5, objects=100000):
+    # time and memory of all TradingStates of a day, and of single objects
+    prices = load_prices(os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv'))
+    trades = load_trades(os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv'))
+    build = lambda: add_market_trades(trades, build_states(prices, SYMBOLS_BY_ROUND_POSITIONABLE[round]))
+    seconds, _ = _best_of(repeat, build)
+    size, _ = _traced_bytes(build)
+    print(f'round {round} day {day}: all states built in {seconds:.3f}s, {size / 2**20:.1f}MB')
+    for name, make in (('Order', lambda: Order('PEARLS', 10000, 1)),
+                       ('Trade', lambda: Trade('PEARLS', 10000, 1, 'Caesar', 'Camilla', 100)),
+                       ('Listing', lambda: Listing('PEARLS', 'PEARLS', '1')),
+                       ('OrderDepth', OrderDepth)):
+        size, _ = _traced_bytes(lambda: [make() for _ in range(objects)])
+        print(f'{name:<12}{size / objects:>6.0f} bytes')
+
+
+# The suite: every stage of a simulation on its own, per training day and
+# time limit. Each case runs in a fresh process, so its peak RSS is its own.
+SUITE_STAGES = ['process_prices_trades', 'load_cached', 'cleanup_order_volumes', 'clear_order_book', 'calc_mid',
+                'trades_position_pnl_run', 'monkeys', 'create_log_file']
+# stages that run a trader, the others don't need one
+TRADER_STAGES = {'cleanup_order_volumes', 'clear_order_book', 'trades_position_pnl_run', 'create_log_file'}
+SUITE_TIME_LIMITS = [99900, 499900, 999900]
+
+
+class NoopTrader:
+    def run(self, state: TradingState) -> dict[Symbol, list[Order]]:
+        return {}
+
+
+class LadderTrader:
+    # Quotes `levels` prices on each side of every positionable symbol,
+    # the inner ones cross the book. The volume stays inside the position limit.
+    LIMITS = { 'PEARLS': 20, 'BANANAS': 20, 'COCONUTS': 600, 'PINA_COLADAS': 300, 'DIVING_GEAR': 50, 'BERRIES': 250,
+               'BAGUETTE': 150, 'DIP': 300, 'UKULELE': 70, 'PICNIC_BASKET': 70 }
+
+    def __init__(self, levels=5):
+        self.levels = levels
+
+    def run(self, state: TradingState) -> dict[Symbol, list[Order]]:
+        result = {}
+        for symbol, position in state.position.items():
+            depth = state.order_depths.get(symbol)
+            if depth is None or not depth.buy_orders or not depth.sell_orders:
+                continue
+            limit = self.LIMITS.get(symbol, 20)
+            bid, ask = max(depth.buy_orders), min(depth.sell_orders)
+            buy_size = max(0, limit - position) // self.levels
+            sell_size = max(0, limit + position) // self.levels
+            orders = []
+            for level in range(self.levels):
+                if buy_size > 0:
+                    orders.append(Order(symbol, ask + 1 - level, buy_size))
+                if sell_size > 0:
+                    orders.append(Order(symbol, bid - 1 + level, -sell_size))
+            result[symbol] = orders
+        return result
+
+
+SUITE_TRADERS = { 'noop': NoopTrader, 'ladder': LadderTrader }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def _simulation_parts(round: int, day: int, time_limit: int):
+    prices, trades = load_day(round, day, True, time_limit)
+    states = DayStates(prices, trades, SYMBOLS_BY_ROUND_POSITIONABLE[round])
+    book = BookIndex(prices)
+    return prices, trades, states, book
+
+def _suite_case(stage: str, trader_name: str | None, round: int, day: int, time_limit: int, repeat: int) -> dict:
+    # runs in its own process, returns the best of `repeat` runs of one stage
+    trader_class = SUITE_TRADERS.get(trader_name, NoopTrader)
+    prices, trades, states, book = _simulation_parts(round, day, time_limit)
+    steps = len(book.times)
+    if stage in ('cleanup_order_volumes', 'clear_order_book'):
+        trader = trader_class()
+        all_orders = [(time, state.order_depths, trader.run(state)) for time, state in states.items()]
+    if stage == 'create_log_file':
+        # the log of a finished run
+        trader = trader_class()
+        ledger = PnLLedger(book.times, list(states[0].position.keys()))
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            trades_position_pnl_run(states, book, int(book.times[-1]), ledger, trader, round, False)
+
+    def once():
+        if stage == 'process_prices_trades':
+            df_prices = pd.read_csv(os.path.join(TRAINING_DATA_PREFIX, f'prices_round_{round}_day_{day}.csv'), sep=';')
+            df_trades = pd.read_csv(os.path.join(TRAINING_DATA_PREFIX, f'trades_round_{round}_day_{day}_wn.csv'), sep=';', dtype={ 'seller': str, 'buyer': str })
+            start = time.perf_counter()
+            process_trades(df_trades, process_prices(df_prices, round, time_limit), time_limit)
+            return time.perf_counter() - start
+        start = time.perf_counter()
+        if stage == 'load_cached':
+            load_day(round, day, True, time_limit)
+        elif stage == 'cleanup_order_volumes':
+            for _, _, orders in all_orders:
+                for symbol_orders in orders.values():
+                    cleanup_order_volumes(symbol_orders)
+        elif stage == 'clear_order_book':
+            for time_, depths, orders in all_orders:
+                clear_order_book(orders, depths, time_, False)
+        elif stage == 'calc_mid':
+            for time_ in book.times.tolist():
+                calc_mid(book, round, time_)
+        elif stage == 'trades_position_pnl_run':
+            run_states = DayStates(prices, trades, SYMBOLS_BY_ROUND_POSITIONABLE[round])
+            run_ledger = PnLLedger(book.times, list(run_states[0].position.keys()))
+            trades_position_pnl_run(run_states, book, int(book.times[-1]), run_ledger, trader_class(), round, False)
+        elif stage == 'monkeys':
+            counterparty_pnl(trades, book, SYMBOLS_BY_ROUND_POSITIONABLE[round])
+        elif stage == 'create_log_file':
+            os.remove(create_log_file(round, day, prices, book, ledger, trader))
+        return time.perf_counter() - start
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        seconds = min(once() for _ in range(repeat))
+    return {
+        'stage': stage,
+        'trader': trader_name,
+        'round': round,
+        'day': day,
+        'time_limit': time_limit,
+        'timestamps': steps,
+        'seconds': seconds,
+        'timestamps_per_second': steps / seconds if seconds > 0 else float('inf'),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+def suite_cases(days: list[tuple[int, int]], time_limits: list[int], stages: list[str]) -> list[tuple]:
+    cases = []
+    for round, day in days:
+        for time_limit in time_limits:
+            for stage in stages:
+                for trader_name in (SUITE_TRADERS if stage in TRADER_STAGES else [None]):
+                    cases.append((stage, trader_name, round, day, time_limit))
+    return cases
+
+def run_suite(days: list[tuple[int, int]] | None = None, time_limits: list[int] | None = None,
+              stages: list[str] | None = None, repeat=3) -> dict:
+    # machine readable results of all cases, one after the other
+    days = days or training_days()
+    cases = suite_cases(days, time_limits or SUITE_TIME_LIMITS, stages or SUITE_STAGES)
+    # load every day once, so the cache exists before load_cached is measured
+    for round, day in days:
+        load_day(round, day)
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as pool:
+        for i, case in enumerate(cases):
+            result = pool.submit(_suite_case, *case, repeat).result()
+            results.append(result)
+            print(f'[{i + 1}/{len(cases)}] {result["stage"]:<24}{str(result["trader"] or ""):<8}round {result["round"]} day {result["day"]:>2} '
+                  f't<={result["time_limit"]:<7}{result["timestamps_per_second"]:>12.0f} ts/s{result["peak_rss_mb"]:>8.0f} MB', file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def _case_key(result: dict) -> tuple:
+    return (result['stage'], result['trader'], result['round'], result['day'], result['time_limit'])
+
+def compare_suite(current: dict, baseline: dict, tolerance=0.1) -> list[dict]:
+    # throughput of every case that is in both, ratio > 1 is faster than the
+    # baseline. Cases slower by more than `tolerance` are marked as regressions.
+    before = { _case_key(result): result for result in baseline['results'] }
+    rows = []
+    for result in current['results']:
+        old = before.get(_case_key(result))
+        if old is None:
+            continue
+        ratio = result['timestamps_per_second'] / old['timestamps_per_second']
+        rows.append({
+            'stage': result['stage'],
+            'trader': result['trader'],
+            'round': result['round'],
+            'day': result['day'],
+            'time_limit': result['time_limit'],
+            'baseline_ts_per_s': old['timestamps_per_second'],
+            'ts_per_s': result['timestamps_per_second'],
+            'speedup': ratio,
+            'baseline_rss_mb': old['peak_rss_mb'],
+            'rss_mb': result['peak_rss_mb'],
+            'regression': ratio < 1 / (1 + tolerance),
+        })
+    return rows
+
+
+def _parse_day(value: str) -> tuple[int, int]:
+    round, _, day = value.partition(':')
+    return int(round), int(day)
+
+
+if __name__ == "__main__" and '--suite' in sys.argv:
+    parser = argparse.ArgumentParser(description='Benchmark suite of the backtester stages.')
+    parser.add_argument('--suite', action='store_true')
+    parser.add_argument('--days', nargs='*', type=_parse_day, help="days as 'round:day', default: all days in the training folder")
+    parser.add_argument('--time-limits', help=f'comma separated, default: {",".join(map(str, SUITE_TIME_LIMITS))}')
+    parser.add_argument('--stages', nargs='*', choices=SUITE_STAGES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--save-baseline', help='write the results as the baseline to this file')
+    parser.add_argument('--compare', help='compare with the baseline in this file')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown counted as a regression, default: 0.1 (10%%)')
+    args = parser.parse_args()
+
+    time_limits = [int(x) for x in args.time_limits.split(',')] if args.time_limits else None
+    report = run_suite(args.days, time_limits, args.stages, args.repeat)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare_suite(report, json.load(f), args.tolerance)
+        with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_rows', None):
+            print(pd.DataFrame(rows).to_string(index=False, float_format='%.2f'))
+        regressions = [row for row in rows if row['regression']]
+        print(f'{len(regressions)} of {len(rows)} cases slower than the baseline by more than {args.tolerance:.0%}')
+        sys.exit(1 if regressions else 0)
+    if not (args.json or args.save_baseline):
+        print(json.dumps(report, indent=1))
+elif __name__ == "__main__" and '--check' in sys.argv:
+    sys.exit(0 if check_aggregate_orders() else 1)
+elif __name__ == "__main__":
+    bench_loader()
+    bench_cache()
+    check_aggregate_orders()
+    bench_aggregate_orders()
+    bench_serializer()
+    bench_datamodel()
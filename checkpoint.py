@@ -0,0 +1,168 @@
+# Snapshots of a running simulation, to replay the end of a day without
+# running the start again.
+#   simulate_alternative(1, -1, trader, checkpointer=Checkpointer('checkpoints', every=100000))
+#   ... edit the Trader ...
+#   resume_simulation(Checkpointer('checkpoints').nearest(740000))
+#   fork_branches(checkpoint, [{'EDGE': 1}, {'EDGE': 2}], data=data)
+# A checkpoint is taken at the start of a step, before Trader.run: the
+# position and own_trades of that state, the ledger rows so far and the
+# pickled trader. Resuming unpickles the trader, so it runs the current
+# code of its class with the state it had at the checkpoint. `params`
+# change attributes of it first, like the parameters of sweep.py.
+import glob
+import gzip
+import os
+import pickle
+
+import numpy as np
+
+from ledger import PnLLedger
+
+LEDGER_ARRAYS = ('profits', 'balance', 'credit', 'unrealized')
+
+
+class Checkpoint:
+    def __init__(self, settings: dict, index: int, time: int, position: dict, own_trades: dict, ledger_rows: dict[str, np.ndarray], trader: bytes):
+        # settings: round, day, time_limit, names and halfway of the run
+        self.settings = settings
+        self.index = index
+        self.time = time
+        self.position = position
+        self.own_trades = own_trades
+        self.ledger_rows = ledger_rows
+        self.trader_bytes = trader
+
+    def trader(self, params: dict | None = None):
+        # the trader of the checkpoint with `params` set on it
+        from sweep import set_params
+
+        trader = pickle.loads(self.trader_bytes)
+        set_params(trader, params or {})
+        return trader
+
+    def restore(self, states, ledger: PnLLedger) -> int:
+        # puts the checkpoint into a fresh run, returns the step to start at
+        state = states[self.time]
+        state.position = dict(self.position)
+        state.own_trades = dict(self.own_trades)
+        for name in LEDGER_ARRAYS:
+            getattr(ledger, name)[:self.index + 1] = self.ledger_rows[name]
+        return self.index
+
+    def save(self, path: str):
+        with gzip.open(path, 'wb', compresslevel=1) as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> 'Checkpoint':
+        with gzip.open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def _pickle_trader(trader) -> bytes:
+    # an injected TradeStore is left out, the resumed run injects a new one
+    store = getattr(trader, 'trade_store', None)
+    if store is not None:
+        trader.trade_store = None
+    try:
+        return pickle.dumps(trader, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        if store is not None:
+            trader.trade_store = store
+
+
+class Checkpointer:
+    # Takes a checkpoint every `every` timestamps, into `directory` as
+    # checkpoint_<time>.pkl.gz or, without a directory, into `saved` in memory.
+    def __init__(self, directory: str | None = 'checkpoints', every=100000):
+        self.directory = directory
+        self.every = every
+        self.settings: dict = {}
+        self.saved: dict[int, Checkpoint] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def due(self, time: int) -> bool:
+        return time % self.every == 0
+
+    def save(self, i: int, time: int, state, ledger: PnLLedger, trader) -> Checkpoint:
+        checkpoint = Checkpoint(
+            dict(self.settings), i, time, dict(state.position), dict(state.own_trades),
+            {name: getattr(ledger, name)[:i + 1].copy() for name in LEDGER_ARRAYS},
+            _pickle_trader(trader),
+        )
+        if self.directory is None:
+            self.saved[time] = checkpoint
+        else:
+            checkpoint.save(self.path(time))
+        return checkpoint
+
+    def path(self, time: int) -> str:
+        return os.path.join(self.directory, f'checkpoint_{time:07d}.pkl.gz')
+
+    def times(self) -> list[int]:
+        if self.directory is None:
+            return sorted(self.saved)
+        paths = glob.glob(os.path.join(self.directory, 'checkpoint_*.pkl.gz'))
+        return sorted(int(os.path.basename(path)[len('checkpoint_'):-len('.pkl.gz')]) for path in paths)
+
+    def nearest(self, time: int) -> Checkpoint:
+        # the last checkpoint at or before `time`
+        earlier = [saved for saved in self.times() if saved <= time]
+        if not earlier:
+            raise ValueError(f'no checkpoint at or before time {time}')
+        if self.directory is None:
+            return self.saved[earlier[-1]]
+        return Checkpoint.load(self.path(earlier[-1]))
+
+
+def resume_simulation(checkpoint: Checkpoint, params: dict | None = None, trader=None, **kwargs) -> PnLLedger:
+    # Runs the rest of the day from `checkpoint` with its trader, or with
+    # `trader` (e.g. a new one with a fresh state). The round, day, time limit
+    # and matching settings are those of the checkpointed run, other keyword
+    # arguments go to simulate_alternative (e.g. log=False, data=...).
+    from backtester import simulate_alternative
+
+    if trader is None:
+        trader = checkpoint.trader(params)
+    settings = {**checkpoint.settings, **kwargs}
+    return simulate_alternative(trader=trader, resume_from=checkpoint, **settings)
+
+
+def fork_branches(checkpoint: Checkpoint, branches: list[dict], **kwargs) -> list[PnLLedger]:
+    # Resumes `checkpoint` once per dict of params in forked processes, which
+    # share the checkpoint and everything loaded before (pass
+    # data=load_day(...) to load the day once) copy-on-write. Returns the
+    # ledgers in the order of `branches`. Without os.fork the branches run
+    # one after the other.
+    kwargs.setdefault('log', False)
+    if not hasattr(os, 'fork'):
+        return [resume_simulation(checkpoint, params, **kwargs) for params in branches]
+    children = []
+    for params in branches:
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            status = 0
+            try:
+                ledger = resume_simulation(checkpoint, params, **kwargs)
+                with os.fdopen(write_end, 'wb') as f:
+                    pickle.dump(ledger, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        os.close(write_end)
+        children.append((pid, read_end))
+    ledgers = []
+    for pid, read_end in children:
+        with os.fdopen(read_end, 'rb') as f:
+            data = f.read()
+        os.waitpid(pid, 0)
+        if not data:
+            raise RuntimeError(f'branch process {pid} failed')
+        ledgers.append(pickle.loads(data))
+    return ledgers
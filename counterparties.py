@@ -0,0 +1,144 @@
+# PnL of the counterparties ("monkeys") in the trades files with names,
+#   python counterparties.py --round 2 --day 0
+# Every trade is a buy for the buyer and a sell for the seller. Positions
+# and cash per (name, timestamp, symbol) are cumulative sums of these legs,
+# positions are marked at BookIndex.nearest_mid like the trader's own.
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from market_data import DayTrades, BookIndex
+
+
+class CounterpartyArrays(NamedTuple):
+    # (timestamp index, symbol index) arrays of one name
+    position: np.ndarray
+    cash: np.ndarray
+    realized: np.ndarray
+    unrealized: np.ndarray
+    pnl: np.ndarray
+
+
+class CounterpartyPnL:
+    # positions and cash are (name, timestamp, symbol) arrays, everything
+    # else is derived from them and the mark prices on access.
+    #   cash:       cash paid (-) or received (+) so far
+    #   realized:   cash at the last timestamp the name was flat in the symbol
+    #   unrealized: the rest, open cash plus the position at the mark price
+    #   pnl:        realized + unrealized, i.e. cash + position * mark
+    def __init__(self, names: list[str], symbols: list[str], times: np.ndarray, positions: np.ndarray, cash: np.ndarray, marks: np.ndarray):
+        self.names = names
+        self.symbols = symbols
+        self.times = times
+        self.positions = positions
+        self.cash = cash
+        self.marks = marks
+        self.index: dict[str, int] = dict(zip(names, range(len(names))))
+        self.columns: dict[str, int] = dict(zip(symbols, range(len(symbols))))
+
+    @property
+    def unrealized(self) -> np.ndarray:
+        return self.cash - self.realized + self.positions * self.marks
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return self.cash + self.positions * self.marks
+
+    @property
+    def realized(self) -> np.ndarray:
+        return _realized(self.positions, self.cash)
+
+    def __getitem__(self, name: str) -> CounterpartyArrays:
+        n = self.index[name]
+        position = self.positions[n]
+        cash = self.cash[n]
+        pnl = cash + position * self.marks[0]
+        realized = _realized(position, cash)
+        return CounterpartyArrays(position, cash, realized, pnl - realized, pnl)
+
+    def final(self) -> pd.DataFrame:
+        # one row per (name, symbol) with the values at the last timestamp
+        positions = self.positions[:, -1]
+        cash = self.cash[:, -1]
+        realized = _realized(self.positions, self.cash)[:, -1]
+        pnl = cash + positions * self.marks[0, -1]
+        return pd.DataFrame({
+            'name': np.repeat(self.names, len(self.symbols)),
+            'symbol': np.tile(self.symbols, len(self.names)),
+            'position': positions.ravel(),
+            'cash': cash.ravel(),
+            'realized': realized.ravel(),
+            'unrealized': (pnl - realized).ravel(),
+            'pnl': pnl.ravel(),
+        })
+
+    def summary(self) -> pd.DataFrame:
+        # final pnl with names as rows and symbols as columns plus the total
+        pivot = self.final().pivot_table(index='name', columns='symbol', values='pnl', aggfunc='sum', sort=False)
+        pivot['TOTAL'] = pivot.sum(axis=1)
+        return pivot.sort_values('TOTAL', ascending=False)
+
+
+def _realized(positions: np.ndarray, cash: np.ndarray) -> np.ndarray:
+    # cash at the last flat timestamp (axis -2), 0 before the first one
+    times = np.arange(positions.shape[-2])[:, None]
+    last_flat = np.where(positions == 0, times, -1)
+    np.maximum.accumulate(last_flat, axis=-2, out=last_flat)
+    realized = np.take_along_axis(cash, np.maximum(last_flat, 0), axis=-2)
+    return np.where(last_flat >= 0, realized, 0.0)
+
+
+def counterparty_pnl(trades: DayTrades, book: BookIndex, symbols: list[str], names: list[str] | None = None) -> CounterpartyPnL:
+    # One pass over all trades: each trade is split into a buyer and a seller
+    # leg, the legs are summed per (name, timestamp, symbol) with bincount and
+    # accumulated over time. `names` restricts the result to these names,
+    # by default every name that appears in `trades`.
+    symbols = [symbol for symbol in symbols if symbol in book.columns]
+    if names is None:
+        names = [name for name in trades.names if name != 'nan']
+    name_codes = np.full(len(trades.names), -1, dtype=np.int64)
+    for n, name in enumerate(names):
+        if name in trades.names:
+            name_codes[trades.names.index(name)] = n
+    symbol_codes = np.full(len(trades.symbol_names), -1, dtype=np.int64)
+    for s, symbol in enumerate(symbols):
+        if symbol in trades.symbol_names:
+            symbol_codes[trades.symbol_names.index(symbol)] = s
+
+    rows = np.searchsorted(book.times, trades.timestamps)
+    quantities = trades.quantities.astype(np.float64)
+    value = trades.prices * quantities
+    who = np.concatenate([name_codes[trades.buyers], name_codes[trades.sellers]])
+    what = np.concatenate([symbol_codes[trades.symbols]] * 2)
+    rows = np.concatenate([rows, rows])
+    position_delta = np.concatenate([quantities, -quantities])
+    cash_delta = np.concatenate([-value, value])
+    keep = (who >= 0) & (what >= 0) & (rows < len(book.times))
+
+    shape = (len(names), len(book.times), len(symbols))
+    flat = np.ravel_multi_index((who[keep], rows[keep], what[keep]), shape)
+    size = int(np.prod(shape))
+    positions = np.bincount(flat, position_delta[keep], minlength=size).reshape(shape)
+    cash = np.bincount(flat, cash_delta[keep], minlength=size).reshape(shape)
+    np.cumsum(positions, axis=1, out=positions)
+    np.cumsum(cash, axis=1, out=cash)
+    marks = book.nearest_mid[:, [book.columns[symbol] for symbol in symbols]][None]
+    return CounterpartyPnL(names, symbols, book.times, positions.astype(np.int32), cash, marks)
+
+
+if __name__ == "__main__":
+    from backtester import SYMBOLS_BY_ROUND_POSITIONABLE, load_day
+
+    parser = argparse.ArgumentParser(description='PnL of every named counterparty in a trades file.')
+    parser.add_argument('--round', type=int, required=True)
+    parser.add_argument('--day', type=int, required=True)
+    parser.add_argument('--names', nargs='*', help='only these names, default: all')
+    parser.add_argument('--time-limit', type=int, default=999900)
+    args = parser.parse_args()
+
+    prices, trades = load_day(args.round, args.day, True, args.time_limit)
+    result = counterparty_pnl(trades, BookIndex(prices), SYMBOLS_BY_ROUND_POSITIONABLE[args.round], args.names)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result.summary())
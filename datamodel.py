@@ -9,13 +9,19 @@ Position = int
 UserId = str
 Observation = int
 
+# The classes below use __slots__, a day creates hundreds of thousands of
+# them. They have no __dict__, use fields() instead of vars().
 class Listing:
+    __slots__ = ('symbol', 'product', 'denomination')
+
     def __init__(self, symbol: Symbol, product: Product, denomination: Product):
         self.symbol = symbol
         self.product = product
         self.denomination = denomination
 
 class Order:
+    __slots__ = ('symbol', 'price', 'quantity')
+
     def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
         self.symbol = symbol
         self.price = price
@@ -29,11 +35,15 @@ class Order:
     
 
 class OrderDepth:
+    __slots__ = ('buy_orders', 'sell_orders')
+
     def __init__(self):
         self.buy_orders: Dict[int, int] = {}
         self.sell_orders: Dict[int, int] = {}
 
 class Trade:
+    __slots__ = ('symbol', 'price', 'quantity', 'buyer', 'seller', 'timestamp')
+
     def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId = None, seller: UserId = None, timestamp: int = 0) -> None:
         self.symbol = symbol
         self.price: int = price
@@ -43,6 +53,8 @@ class Trade:
         self.timestamp = timestamp
 
 class TradingState(object):
+    __slots__ = ('timestamp', 'listings', 'order_depths', 'own_trades', 'market_trades', 'position', 'observations')
+
     def __init__(self,
                  timestamp: Time,
                  listings: Dict[Symbol, Listing],
@@ -60,8 +72,16 @@ class TradingState(object):
         self.observations = observations
         
     def toJSON(self):
-        return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True)
+        return json.dumps(self, default=fields, sort_keys=True)
+
+
+def fields(o) -> dict:
+    # the attributes of a datamodel object by name, works with and without __slots__
+    if hasattr(o, '__dict__'):
+        return o.__dict__
+    return { name: getattr(o, name) for name in o.__slots__ }
     
 class ProsperityEncoder(JSONEncoder):
         def default(self, o):
-            return o.__dict__
+            return fields(o)
+
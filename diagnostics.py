@@ -0,0 +1,150 @@
+# What went wrong with the orders of a run: orders that found nothing to
+# match, orders that were only partly filled and trades that would have
+# broken a position limit. Events are counted per (event, symbol) in
+# preallocated arrays, no strings are built while the simulation runs.
+# Levels:
+#   QUIET   nothing is recorded
+#   COUNT   counters only (default)
+#   RECORD  counters and the last `capacity` events, every event also goes
+#           to the JSONL `sink` if one is given
+#   PRINT   like RECORD and every event is printed when it happens
+import json
+
+import numpy as np
+import pandas as pd
+
+from datamodel import Order, Trade, fields
+
+QUIET = 0
+COUNT = 1
+RECORD = 2
+PRINT = 3
+
+UNMATCHED_ORDER = 0
+PARTIAL_FILL = 1
+LIMIT_BREACH = 2
+EVENT_NAMES = ['unmatched order', 'partial fill', 'limit breach']
+
+# event buffer columns, `extra` is the filled volume of a partial fill and
+# the position the trade would have led to of a limit breach
+COLUMNS = ['event', 'timestamp', 'symbol', 'price', 'quantity', 'extra']
+
+
+class Diagnostics:
+    def __init__(self, level=COUNT, capacity=4096, sink: str | None = None, max_symbols=16):
+        self.level = level
+        self.capacity = capacity
+        self.sink_path = sink
+        self.sink = None
+        self.symbols: list[str] = []
+        self.symbol_codes: dict[str, int] = {}
+        # (event, symbol) counts and absolute volumes
+        self.counts = np.zeros((len(EVENT_NAMES), max_symbols), dtype=np.int64)
+        self.volumes = np.zeros((len(EVENT_NAMES), max_symbols), dtype=np.int64)
+        # ring buffer of the last `capacity` events, one row per event
+        self.events = np.zeros((capacity, len(COLUMNS)), dtype=np.int64)
+        self.recorded = 0
+        self.flushed = 0
+
+    def _code(self, symbol: str) -> int:
+        code = self.symbol_codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            self.symbols.append(symbol)
+            self.symbol_codes[symbol] = code
+            if code == self.counts.shape[1]:
+                self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)], axis=1)
+                self.volumes = np.concatenate([self.volumes, np.zeros_like(self.volumes)], axis=1)
+        return code
+
+    def _event(self, event: int, time: int, symbol: str, price: int, quantity: int, extra: int):
+        code = self._code(symbol)
+        self.counts[event, code] += 1
+        self.volumes[event, code] += abs(quantity)
+        if self.level < RECORD:
+            return
+        if self.sink_path is not None and self.recorded - self.flushed == self.capacity:
+            # the oldest event would be overwritten, write the buffer out first
+            self.flush()
+        self.events[self.recorded % self.capacity] = (event, time, code, price, quantity, extra)
+        self.recorded += 1
+
+    def unmatched(self, time: int, order: Order):
+        if self.level:
+            self._event(UNMATCHED_ORDER, time, order.symbol, order.price, order.quantity, 0)
+            if self.level == PRINT:
+                print(f'No matches for order {order} at time {time}')
+
+    def partial_fill(self, time: int, order: Order, filled: int):
+        # `order` is the part that was not filled
+        if self.level:
+            self._event(PARTIAL_FILL, time, order.symbol, order.price, order.quantity, filled)
+            if self.level == PRINT:
+                print(f'Order ({order.symbol}, {order.price}, {order.quantity + filled}) filled {filled} at time {time}')
+
+    def limit_breach(self, time: int, trade: Trade, position: int, trades: list[Trade]):
+        # `trade` would have taken the position to `position`, `trades` are
+        # all trades of this step
+        if self.level:
+            self._event(LIMIT_BREACH, time, trade.symbol, trade.price, trade.quantity, position)
+            if self.level == PRINT:
+                print('ILLEGAL TRADE, WOULD EXCEED POSITION LIMIT, KILLING ALL REMAINING ORDERS')
+                print(f'Stopped at the following trade: {_trade_text(trade)}')
+                print(f"All trades that were sent:")
+                for sent in trades:
+                    print(_trade_text(sent))
+
+    def recent(self) -> pd.DataFrame:
+        # the events still in the buffer, oldest first
+        start = max(0, self.recorded - self.capacity)
+        rows = self.events[np.arange(start, self.recorded) % self.capacity]
+        frame = pd.DataFrame(rows, columns=COLUMNS)
+        frame['event'] = [EVENT_NAMES[event] for event in frame['event']]
+        frame['symbol'] = [self.symbols[code] for code in frame['symbol']]
+        return frame
+
+    def flush(self):
+        # writes the events since the last flush to the sink, one JSON object per line
+        if self.sink_path is None or self.recorded == self.flushed:
+            return
+        if self.sink is None:
+            self.sink = open(self.sink_path, 'w', encoding='utf-8')
+        rows = self.events[np.arange(self.flushed, self.recorded) % self.capacity].tolist()
+        self.sink.writelines(json.dumps({
+            'event': EVENT_NAMES[event], 'timestamp': time, 'symbol': self.symbols[code],
+            'price': price, 'quantity': quantity, 'extra': extra,
+        }) + '\n' for event, time, code, price, quantity, extra in rows)
+        self.flushed = self.recorded
+
+    def close(self):
+        self.flush()
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def summary(self) -> pd.DataFrame:
+        # one row per (event, symbol) that happened at least once
+        n = len(self.symbols)
+        events, codes = np.nonzero(self.counts[:, :n])
+        return pd.DataFrame({
+            'event': [EVENT_NAMES[event] for event in events],
+            'symbol': [self.symbols[code] for code in codes],
+            'count': self.counts[events, codes],
+            'volume': self.volumes[events, codes],
+        })
+
+    def print_summary(self):
+        summary = self.summary()
+        if len(summary) == 0:
+            return
+        print(f'{"event":<18}{"symbol":<20}{"count":>10}{"volume":>10}')
+        for event, symbol, count, volume in summary.itertuples(index=False):
+            print(f'{event:<18}{symbol:<20}{count:>10}{volume:>10}')
+
+
+def _trade_text(trade: Trade) -> str:
+    return ', '.join("%s: %s" % item for item in fields(trade).items())
+
+
+# for callers that do not want diagnostics
+NULL_DIAGNOSTICS = Diagnostics(QUIET, capacity=1)
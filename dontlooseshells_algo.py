@@ -1,38 +1,116 @@
 import json
+import tempfile
+from collections import OrderedDict
 from datamodel import Order, ProsperityEncoder, Symbol, TradingState, Trade
 from typing import Any
 
-class Logger:
+class LogBuffer:
+    # Log lines by timestamp of one run, at most `max_bytes` of them are kept
+    # in memory. Beyond that the oldest lines are dropped (counted in
+    # `dropped`), or with spill=True moved to a temporary file and read back
+    # when they are taken. The backtester takes every line once it wrote it
+    # to the log file, so usually only the current one is held.
+    def __init__(self, max_bytes=16 * 1024 * 1024, spill=False) -> None:
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.lines: OrderedDict[int, str] = OrderedDict()
+        self.nbytes = 0
+        self.dropped = 0
+        self.spilled: dict[int, tuple[int, int]] = {}
+        self.spill_file = None
+
+    def put(self, timestamp: int, line: str) -> None:
+        self.pop(timestamp)
+        self.lines[timestamp] = line
+        self.nbytes += len(line)
+        while self.nbytes > self.max_bytes and len(self.lines) > 1:
+            old_timestamp, old_line = self.lines.popitem(last=False)
+            self.nbytes -= len(old_line)
+            if self.spill:
+                if self.spill_file is None:
+                    self.spill_file = tempfile.TemporaryFile()
+                data = old_line.encode('utf-8')
+                self.spill_file.seek(0, 2)
+                self.spilled[old_timestamp] = (self.spill_file.tell(), len(data))
+                self.spill_file.write(data)
+            else:
+                self.dropped += 1
+
+    def get(self, timestamp: int) -> str | None:
+        if timestamp in self.lines:
+            return self.lines[timestamp]
+        if timestamp in self.spilled:
+            offset, length = self.spilled[timestamp]
+            self.spill_file.seek(offset)
+            return self.spill_file.read(length).decode('utf-8')
+        return None
+
+    def pop(self, timestamp: int) -> str | None:
+        line = self.get(timestamp)
+        if timestamp in self.lines:
+            self.nbytes -= len(self.lines.pop(timestamp))
+        self.spilled.pop(timestamp, None)
+        return line
+
+    def clear(self) -> None:
+        self.lines.clear()
+        self.spilled.clear()
+        self.nbytes = 0
+        self.dropped = 0
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __len__(self) -> int:
+        return len(self.lines) + len(self.spilled)
+
+class LocalLogger:
+    # The logger for local runs, the Trader below uses it. It is not called
+    # Logger because the platform logger further down would replace it.
     # Set this to true, if u want to create
     # local logs
     local: bool 
-    # this is used as a buffer for logs
-    # instead of stdout
-    local_logs: dict[int, str] = {}
 
-    def __init__(self, local=False) -> None:
+    def __init__(self, local=False, max_bytes=16 * 1024 * 1024, spill=False, compact=False) -> None:
         self.logs = ""
         self.local = local
+        # this is used as a buffer for logs instead of stdout,
+        # one per Logger and bounded, see LogBuffer
+        self.local_logs = LogBuffer(max_bytes, spill)
+        # compact: the compressed state the visualizer reads (compress_state)
+        # instead of the full state
+        self.compact = compact
 
     def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
         self.logs += sep.join(map(str, objects)) + end
 
     def flush(self, state: TradingState, orders: dict[Symbol, list[Order]]) -> None:
-        output = json.dumps({
-            "state": state,
-            "orders": orders,
-            "logs": self.logs,
-        }, cls=ProsperityEncoder, separators=(",", ":"), sort_keys=True)
+        if self.compact:
+            output = json.dumps({
+                "state": self.compress_state(state),
+                "orders": self.compress_orders(orders),
+                "logs": self.logs,
+            }, cls=ProsperityEncoder, separators=(",", ":"), sort_keys=True)
+        else:
+            output = json.dumps({
+                "state": state,
+                "orders": orders,
+                "logs": self.logs,
+            }, cls=ProsperityEncoder, separators=(",", ":"), sort_keys=True)
         if self.local:
-            self.local_logs[state.timestamp] = output
+            self.local_logs.put(state.timestamp, output)
         print(output)
 
         self.logs = ""
 
+    def take(self, timestamp: int) -> str | None:
+        # hands the line of `timestamp` over to the log writer and forgets it
+        return self.local_logs.pop(timestamp)
+
     def compress_state(self, state: TradingState) -> dict[str, Any]:
         listings = []
         for listing in state.listings.values():
-            listings.append([listing["symbol"], listing["product"], listing["denomination"]])
+            listings.append([listing.symbol, listing.product, listing.denomination])
 
         order_depths = {}
         for symbol, order_depth in state.order_depths.items():
@@ -0,0 +1,244 @@
+# Rolling indicators for traders, every update() is O(1) whatever the
+# window. Only needs the standard library and numpy, so the file (or the
+# classes a trader uses) can be pasted into a submission.
+#   self.mean = RollingMean(500)
+#   ...
+#   self.mean.update(mid)
+#   if self.mean.full and mid > self.mean.value: ...
+# warm(values) fills an indicator from history in one go with numpy, it
+# ends in the same state as calling update() on each value.
+import math
+from collections import deque
+
+import numpy as np
+
+
+class RollingWindow:
+    # the last `window` values in a ring buffer
+    def __init__(self, window: int):
+        self.window = window
+        self.values = [0.0] * window
+        self.count = 0
+        self.next = 0
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.window
+
+    def push(self, value: float) -> float | None:
+        # stores value, returns the value it replaced once the window is full
+        old = self.values[self.next] if self.count == self.window else None
+        self.values[self.next] = value
+        self.next = (self.next + 1) % self.window
+        if old is None:
+            self.count += 1
+        return old
+
+    def ordered(self) -> list[float]:
+        # oldest first
+        if self.count < self.window:
+            return self.values[:self.count]
+        return self.values[self.next:] + self.values[:self.next]
+
+    def _fill(self, values) -> np.ndarray:
+        last = np.asarray(values, dtype=np.float64)[-self.window:]
+        self.values = last.tolist() + [0.0] * (self.window - len(last))
+        self.count = len(last)
+        self.next = self.count % self.window
+        return last
+
+
+class RollingMean(RollingWindow):
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.total = 0.0
+
+    def update(self, value: float) -> float:
+        old = self.push(value)
+        self.total += value - (old or 0.0)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def warm(self, values):
+        self.total = float(self._fill(values).sum())
+
+
+class RollingVariance(RollingWindow):
+    # Welford's update, with the oldest value swapped for the new one when
+    # the window is full. Sample variance (n - 1).
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float) -> float:
+        old = self.push(value)
+        if old is None:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        else:
+            previous_mean = self.mean
+            self.mean += (value - old) / self.count
+            self.m2 += (value - old) * (value - self.mean + old - previous_mean)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return max(self.m2, 0.0) / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.value)
+
+    def zscore(self, value: float) -> float:
+        # how many standard deviations value is from the rolling mean
+        std = self.std
+        return (value - self.mean) / std if std > 0 else 0.0
+
+    def warm(self, values):
+        last = self._fill(values)
+        self.mean = float(last.mean()) if len(last) else 0.0
+        self.m2 = float(((last - self.mean) ** 2).sum())
+
+
+class EMA:
+    # exponential moving average, starts at the first value
+    def __init__(self, alpha: float | None = None, span: int | None = None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = math.nan
+        self.count = 0
+
+    def update(self, value: float) -> float:
+        if self.count == 0:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        self.count += 1
+        return self.value
+
+    def warm(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        # value_n = (1 - a)^(n-1) x_0 + sum_k a (1 - a)^(n-1-k) x_k
+        decay = (1 - self.alpha) ** np.arange(n - 1, -1, -1)
+        weights = self.alpha * decay
+        weights[0] = decay[0]
+        self.value = float(weights @ values)
+        self.count = n
+
+
+class RollingVWAP:
+    # volume weighted price of the last `window` trades (or updates)
+    def __init__(self, window: int):
+        self.prices = RollingWindow(window)
+        self.volumes = RollingWindow(window)
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    @property
+    def full(self) -> bool:
+        return self.prices.full
+
+    def update(self, price: float, volume: float) -> float:
+        volume = abs(volume)
+        old_price = self.prices.push(price)
+        old_volume = self.volumes.push(volume)
+        if old_price is not None:
+            self.price_volume -= old_price * old_volume
+            self.volume -= old_volume
+        self.price_volume += price * volume
+        self.volume += volume
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.price_volume / self.volume if self.volume > 0 else math.nan
+
+    def warm(self, prices, volumes):
+        prices = self.prices._fill(prices)
+        volumes = self.volumes._fill(np.abs(np.asarray(volumes, dtype=np.float64)))
+        self.price_volume = float(prices @ volumes)
+        self.volume = float(volumes.sum())
+
+
+class RollingMax:
+    # Monotonic deque of (index, value) with decreasing values, the front is
+    # the maximum of the window. Each value is added and removed once.
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.candidates: deque[tuple[int, float]] = deque()
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.window
+
+    def _beats(self, value: float, other: float) -> bool:
+        return value >= other
+
+    def update(self, value: float) -> float:
+        candidates = self.candidates
+        while candidates and self._beats(value, candidates[-1][1]):
+            candidates.pop()
+        candidates.append((self.count, value))
+        self.count += 1
+        if candidates[0][0] <= self.count - 1 - self.window:
+            candidates.popleft()
+        return candidates[0][1]
+
+    @property
+    def value(self) -> float:
+        return self.candidates[0][1] if self.candidates else math.nan
+
+    def warm(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.count = max(len(values) - self.window, 0)
+        self.candidates.clear()
+        for value in values[-self.window:].tolist():
+            self.update(value)
+
+
+class RollingMin(RollingMax):
+    def _beats(self, value: float, other: float) -> bool:
+        return value <= other
+
+
+class RollingSlope(RollingWindow):
+    # slope of the least squares line through the window against 0, 1, ...,
+    # i.e. the trend per update. Keeps sum(y) and sum(i * y) up to date.
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.sum_y = 0.0
+        self.sum_iy = 0.0
+
+    def update(self, value: float) -> float:
+        index = self.count
+        old = self.push(value)
+        if old is None:
+            self.sum_iy += index * value
+            self.sum_y += value
+        else:
+            # every value moves one index down, the new one is last
+            self.sum_iy += old - self.sum_y + (self.window - 1) * value
+            self.sum_y += value - old
+        return self.value
+
+    @property
+    def value(self) -> float:
+        n = self.count
+        if n < 2:
+            return math.nan
+        sum_i = n * (n - 1) / 2
+        sum_ii = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self.sum_iy - sum_i * self.sum_y) / (n * sum_ii - sum_i * sum_i)
+
+    def warm(self, values):
+        last = self._fill(values)
+        self.sum_y = float(last.sum())
+        self.sum_iy = float(np.arange(len(last)) @ last)
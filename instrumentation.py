@@ -0,0 +1,130 @@
+# Measures every Trader.run call like the platform would: wall time,
+# memory allocated during the call (tracemalloc, optional because it slows
+# everything down) and the size of the returned traderData. Calls over the
+# budget are flagged with their timestamp.
+import math
+import time
+import tracemalloc
+from typing import Any
+
+import numpy as np
+
+# what the platform gave a Trader.run call
+TIME_BUDGET_MS = 900.0
+MEMORY_BUDGET_MB = 128.0
+
+
+def unpack_run_result(result) -> tuple[dict, Any]:
+    # Trader.run returns orders, (orders, traderData) or
+    # (orders, conversions, traderData), traderData is None otherwise
+    if isinstance(result, tuple):
+        if len(result) == 3:
+            return result[0], result[2]
+        if len(result) == 2:
+            return result[0], result[1]
+        return result[0], None
+    return result, None
+
+
+class RunMonitor:
+    def __init__(self, steps: int, time_budget_ms=TIME_BUDGET_MS, memory_budget_mb=MEMORY_BUDGET_MB, trace_memory=False):
+        self.time_budget_ms = time_budget_ms
+        self.memory_budget_mb = memory_budget_mb
+        self.trace_memory = trace_memory
+        self.timestamps = np.zeros(steps, dtype=np.int64)
+        self.durations_ms = np.zeros(steps, dtype=np.float64)
+        self.peaks = np.zeros(steps, dtype=np.int64)
+        self.trader_data_sizes = np.zeros(steps, dtype=np.int64)
+        self.calls = 0
+        self._started_tracing = False
+
+    def run(self, trader, state) -> dict:
+        # calls trader.run(state), records it and returns the orders
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = trader.run(state)
+        elapsed = (time.perf_counter() - start) * 1000
+        orders, trader_data = unpack_run_result(result)
+        i = self.calls
+        if i == len(self.timestamps):
+            self._grow()
+        self.timestamps[i] = state.timestamp
+        self.durations_ms[i] = elapsed
+        if self.trace_memory:
+            self.peaks[i] = tracemalloc.get_traced_memory()[1] - before
+        if trader_data is not None:
+            self.trader_data_sizes[i] = len(str(trader_data).encode('utf-8'))
+        self.calls += 1
+        if elapsed > self.time_budget_ms:
+            print(f'Trader.run took {elapsed:.1f} ms at time {state.timestamp}, the budget is {self.time_budget_ms} ms')
+        if self.trace_memory and self.peaks[i] > self.memory_budget_mb * 2**20:
+            print(f'Trader.run allocated {self.peaks[i] / 2**20:.1f} MB at time {state.timestamp}, the budget is {self.memory_budget_mb} MB')
+        return orders
+
+    def _grow(self):
+        for name in ('timestamps', 'durations_ms', 'peaks', 'trader_data_sizes'):
+            values = getattr(self, name)
+            setattr(self, name, np.concatenate([values, np.zeros_like(values)]))
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def over_budget(self) -> list[int]:
+        # timestamps of the calls that took too long or used too much memory
+        n = self.calls
+        over = self.durations_ms[:n] > self.time_budget_ms
+        if self.trace_memory:
+            over |= self.peaks[:n] > self.memory_budget_mb * 2**20
+        return self.timestamps[:n][over].tolist()
+
+    def summary(self) -> dict[str, float]:
+        n = self.calls
+        if n == 0:
+            return {}
+        durations = self.durations_ms[:n]
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99]).tolist()
+        stats = {
+            'calls': n,
+            'mean_ms': float(durations.mean()),
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'max_ms': float(durations.max()),
+            'max_ms_time': int(self.timestamps[durations.argmax()]),
+            'max_trader_data_bytes': int(self.trader_data_sizes[:n].max()),
+            'over_budget': len(self.over_budget()),
+        }
+        if self.trace_memory:
+            stats['max_peak_mb'] = float(self.peaks[:n].max() / 2**20)
+        return stats
+
+    def print_summary(self):
+        stats = self.summary()
+        if not stats:
+            return
+        print(f"Trader.run over {stats['calls']} calls: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+              f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms at time {stats['max_ms_time']}")
+        if self.trace_memory:
+            print(f"Trader.run peak allocation {stats['max_peak_mb']:.2f} MB")
+        if stats['max_trader_data_bytes']:
+            print(f"Largest traderData {stats['max_trader_data_bytes']} bytes")
+        if stats['over_budget']:
+            print(f"{stats['over_budget']} calls over budget, at times {self.over_budget()[:20]}")
+
+    def report_line(self, request_id: str) -> str:
+        # the REPORT line of the log with the measured numbers, Duration is the mean call
+        stats = self.summary()
+        mean = stats.get('mean_ms', 0.0)
+        line = (f'REPORT RequestId: {request_id}\tDuration: {mean:.2f} ms\tBilled Duration: {math.ceil(mean)} ms\t'
+                f'Memory Size: {self.memory_budget_mb:.0f} MB')
+        if self.trace_memory:
+            line += f"\tMax Memory Used: {math.ceil(stats.get('max_peak_mb', 0.0))} MB"
+        line += f"\tMax Duration: {stats.get('max_ms', 0.0):.2f} ms\tp99 Duration: {stats.get('p99_ms', 0.0):.2f} ms"
+        return line + '\n'
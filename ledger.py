@@ -0,0 +1,70 @@
+from collections.abc import Mapping
+from typing import Iterator
+import numpy as np
+
+
+class LedgerView(Mapping):
+    # Read-only dict[int, dict[str, float]] view of one ledger array, this is
+    # the shape profits_by_symbol & co. had before they were arrays
+    def __init__(self, ledger: 'PnLLedger', values: np.ndarray):
+        self.ledger = ledger
+        self.values = values
+
+    def __getitem__(self, time: int) -> dict[str, float]:
+        return dict(zip(self.ledger.symbols, self.values[self.ledger.index[time]].tolist()))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ledger.index)
+
+    def __len__(self) -> int:
+        return len(self.ledger.index)
+
+    def __contains__(self, time) -> bool:
+        return time in self.ledger.index
+
+
+class PnLLedger:
+    # The four PnL time series of the backtester (see README), stored as
+    # preallocated (timestamp index, symbol index) float64 arrays that the
+    # simulation updates in place.
+    #   profits:    realized pnl, moved over from credit whenever a position is closed
+    #   credit:     cash paid (-) or received (+) for the currently open position
+    #   unrealized: value of the open position at the mark price
+    #   balance:    credit + unrealized
+    def __init__(self, times: np.ndarray, symbols: list[str]):
+        self.times = np.asarray(times)
+        self.symbols = list(symbols)
+        self.index: dict[int, int] = dict(zip(self.times.tolist(), range(len(self.times))))
+        self.columns: dict[str, int] = dict(zip(self.symbols, range(len(self.symbols))))
+        shape = (len(self.times), len(self.symbols))
+        self.profits = np.zeros(shape, dtype=np.float64)
+        self.balance = np.zeros(shape, dtype=np.float64)
+        self.credit = np.zeros(shape, dtype=np.float64)
+        self.unrealized = np.zeros(shape, dtype=np.float64)
+
+    def carry(self, i: int):
+        # start row i + 1 from the values of row i
+        self.profits[i + 1] = self.profits[i]
+        self.balance[i + 1] = self.balance[i]
+        self.credit[i + 1] = self.credit[i]
+        self.unrealized[i + 1] = self.unrealized[i]
+
+    def total(self, i: int = -1) -> float:
+        # profit and loss over all symbols, like the log file reports it
+        return float(self.profits[i].sum() + self.balance[i].sum())
+
+    @property
+    def profits_by_symbol(self) -> LedgerView:
+        return LedgerView(self, self.profits)
+
+    @property
+    def balance_by_symbol(self) -> LedgerView:
+        return LedgerView(self, self.balance)
+
+    @property
+    def credit_by_symbol(self) -> LedgerView:
+        return LedgerView(self, self.credit)
+
+    @property
+    def unrealized_by_symbol(self) -> LedgerView:
+        return LedgerView(self, self.unrealized)
@@ -0,0 +1,180 @@
+# Writes the log file of a run while the simulation is going, in the
+# format of the Prosperity website logs (Sandbox logs, Submission logs,
+# Activities log), which jmerle's visualizer reads.
+# The sandbox lines go straight into the log. The activity rows come after
+# all of them in the file, so they are written to a sidecar file
+# (`<log>.activities`) in batches and appended to the log on close(). If a
+# run is killed, the log has the sandbox lines so far and the sidecar has
+# the activity rows so far.
+import gzip
+import io
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from instrumentation import RunMonitor
+from ledger import PnLLedger
+from market_data import DayPrices, BookIndex
+
+CSV_HEADER = "day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;ask_price_3;ask_volume_3;mid_price;profit_and_loss\n"
+LOG_HEADER = [
+    'Sandbox logs:\n',
+    '0 OpenBLAS WARNING - could not determine the L2 cache size on this system, assuming 256k\n',
+]
+# the END line goes to the end of the sandbox logs, followed by the REPORT
+# line with the measured numbers if the run had a RunMonitor
+START_LINE = 'START RequestId: {} Version: $LATEST\n'
+END_LINE = 'END RequestId: {}\n'
+COMPRESSIONS = { None: '', 'gzip': '.gz', 'zstd': '.zst' }
+BUFFER_SIZE = 1 << 20
+
+
+def new_log_path(directory='logs', compression: str | None = None) -> str:
+    file_name = uuid.uuid4()
+    timest = datetime.timestamp(datetime.now())
+    return os.path.join(directory, f'{timest}_{file_name}.log{COMPRESSIONS[compression]}')
+
+
+def open_log(path: str, compression: str | None = None) -> io.TextIOBase:
+    if compression is None:
+        return open(path, 'w', encoding='utf-8', newline='\n', buffering=BUFFER_SIZE)
+    if compression == 'gzip':
+        raw = gzip.open(path, 'wb', compresslevel=6)
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('zstd compressed logs need the zstandard package (pip install zstandard)')
+        raw = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+    else:
+        raise ValueError(f'unknown log compression {compression!r}, use one of {list(COMPRESSIONS)}')
+    return io.TextIOWrapper(io.BufferedWriter(raw, BUFFER_SIZE), encoding='utf-8', newline='\n')
+
+
+def _side(prices: list[int], volumes: list[int], sign: int) -> str:
+    # the levels of one side as 'price;volume;' * 3, like an OrderDepth of
+    # them would print (missing levels are skipped, a price seen twice
+    # keeps its first place and the last volume)
+    levels: dict[int, int] = {}
+    for price, volume in zip(prices, volumes):
+        if price > 0:
+            levels[price] = sign * volume
+    fields = [f'{price};{volume};' for price, volume in list(levels.items())[:3]]
+    return ''.join(fields) + ';;' * (3 - len(fields))
+
+
+class LogWriter:
+    # Rows are handed over with step(i, time) once row i of the ledger is
+    # final, every `batch` rows they are formatted from the price, book and
+    # ledger arrays and written out.
+    def __init__(self,
+                 path: str,
+                 day: int | np.ndarray,
+                 prices: DayPrices,
+                 book: BookIndex,
+                 ledger: PnLLedger,
+                 symbols: list[str],
+                 compression: str | None = None,
+                 batch=1000,
+                 monitor: RunMonitor | None = None):
+        self.path = path
+        self.sidecar_path = f'{path}.activities'
+        # `day` is the day of every row, or an array with the day of each
+        # timestamp for runs over several days
+        self.day = day
+        self.days = np.broadcast_to(np.asarray(day), book.times.shape)
+        self.prices = prices
+        self.book = book
+        self.ledger = ledger
+        self.batch = batch
+        # (symbol, book column, ledger column or -1) in log order
+        self.symbols = [(symbol, book.columns[symbol], ledger.columns.get(symbol, -1)) for symbol in symbols if symbol in book.columns]
+        # price file row of every (timestamp, symbol)
+        self.rows = np.full((len(book.times), len(book.symbols)), -1, dtype=np.int64)
+        counts = prices.group_ends - prices.group_starts
+        self.rows[np.repeat(np.arange(len(book.times)), counts), prices.products] = np.arange(len(prices.products))
+        self.written = 0
+        self.pending = 0
+        self.log = open_log(path, compression)
+        self.sidecar = open(self.sidecar_path, 'w', encoding='utf-8', newline='\n', buffering=BUFFER_SIZE)
+        self.monitor = monitor
+        self.request_id = str(uuid.uuid4())
+        self.log.writelines(LOG_HEADER)
+        self.log.write(START_LINE.format(self.request_id))
+        self.log.write('\n')
+
+    def step(self, i: int, time: int, sandbox: str | None = None):
+        if sandbox is not None:
+            self.log.write(f'{time} {sandbox}\n')
+        elif time != 0:
+            self.log.write(f'{time}\n')
+        self.pending = i + 1
+        if self.pending - self.written >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending > self.written:
+            self.sidecar.write(self.activity_rows(self.written, self.pending))
+            self.written = self.pending
+        self.sidecar.flush()
+        self.log.flush()
+
+    def activity_rows(self, start: int, end: int) -> str:
+        # the Activities log lines of ledger rows [start, end)
+        prices = self.prices
+        rows = self.rows[start:end]
+        used = rows[rows >= 0]
+        first, last = (int(used.min()), int(used.max()) + 1) if len(used) else (0, 0)
+        bid_prices = prices.bid_prices[first:last].tolist()
+        bid_volumes = prices.bid_volumes[first:last].tolist()
+        ask_prices = prices.ask_prices[first:last].tolist()
+        ask_volumes = prices.ask_volumes[first:last].tolist()
+        observations = prices.mid_prices[first:last].tolist()
+        mids = self.book.mid[start:end].tolist()
+        pnl = (self.ledger.profits[start:end] + self.ledger.balance[start:end]).tolist()
+        days = self.days[start:end].tolist()
+        lines = []
+        for k, time in enumerate(self.book.times[start:end].tolist()):
+            row_k = rows[k].tolist()
+            for symbol, column, ledger_column in self.symbols:
+                if row_k[column] < 0:
+                    continue
+                r = row_k[column] - first
+                prefix = f'{days[k]};{time};{symbol};{_side(bid_prices[r], bid_volumes[r], 1)}{_side(ask_prices[r], ask_volumes[r], -1)}'
+                mid = mids[k][column]
+                if mid != mid:
+                    if symbol == 'DOLPHIN_SIGHTINGS':
+                        lines.append(f'{prefix}{observations[r]};{0.0}\n')
+                    else:
+                        lines.append(f'{prefix}{0};{0.0}\n')
+                else:
+                    profit = pnl[k][ledger_column] if ledger_column >= 0 else 0.0
+                    lines.append(f'{prefix}{mid};{profit}\n')
+        return ''.join(lines)
+
+    def close(self):
+        # appends the activity rows to the log and removes the sidecar
+        if self.log.closed:
+            return
+        self.flush()
+        self.sidecar.close()
+        self.log.write(END_LINE.format(self.request_id))
+        if self.monitor is not None:
+            self.log.write(self.monitor.report_line(self.request_id))
+        self.log.write('\n\n')
+        self.log.write('Submission logs:\n\n\n')
+        self.log.write('Activities log:\n')
+        self.log.write(CSV_HEADER)
+        with open(self.sidecar_path, 'r', encoding='utf-8', newline='\n') as sidecar:
+            shutil.copyfileobj(sidecar, self.log, BUFFER_SIZE)
+        self.log.close()
+        os.remove(self.sidecar_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
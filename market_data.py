@@ -0,0 +1,538 @@
+from datamodel import *
+from typing import Any, Iterator
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import gc
+import glob
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Number of book levels in the training files (bid_price_1..3, ask_price_1..3)
+BOOK_LEVELS = 3
+
+BID_PRICE_COLUMNS = [f'bid_price_{i}' for i in range(1, BOOK_LEVELS + 1)]
+BID_VOLUME_COLUMNS = [f'bid_volume_{i}' for i in range(1, BOOK_LEVELS + 1)]
+ASK_PRICE_COLUMNS = [f'ask_price_{i}' for i in range(1, BOOK_LEVELS + 1)]
+ASK_VOLUME_COLUMNS = [f'ask_volume_{i}' for i in range(1, BOOK_LEVELS + 1)]
+
+
+class DayPrices:
+    # Columnar copy of a prices_round_{r}_day_{d}.csv file.
+    # One row per (timestamp, product), in file order. Missing book levels
+    # have price 0 and volume 0, symbols are codes into `symbols`.
+    def __init__(self,
+                 timestamps: np.ndarray,
+                 products: np.ndarray,
+                 symbols: list[str],
+                 bid_prices: np.ndarray,
+                 bid_volumes: np.ndarray,
+                 ask_prices: np.ndarray,
+                 ask_volumes: np.ndarray,
+                 mid_prices: np.ndarray):
+        self.timestamps = timestamps
+        self.products = products
+        self.symbols = symbols
+        self.bid_prices = bid_prices
+        self.bid_volumes = bid_volumes
+        self.ask_prices = ask_prices
+        self.ask_volumes = ask_volumes
+        self.mid_prices = mid_prices
+        # rows of one timestamp are contiguous, group them once
+        starts = np.flatnonzero(np.diff(timestamps)) + 1
+        self.group_starts = np.concatenate(([0], starts)).astype(np.int64)
+        self.group_ends = np.concatenate((starts, [len(timestamps)])).astype(np.int64)
+        self.times = timestamps[self.group_starts] if len(timestamps) > 0 else np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class DayTrades:
+    # Columnar copy of a trades_round_{r}_day_{d}_{wn,nn}.csv file.
+    # Buyer and seller are codes into `names`.
+    def __init__(self,
+                 timestamps: np.ndarray,
+                 symbols: np.ndarray,
+                 symbol_names: list[str],
+                 prices: np.ndarray,
+                 quantities: np.ndarray,
+                 buyers: np.ndarray,
+                 sellers: np.ndarray,
+                 names: list[str]):
+        self.timestamps = timestamps
+        self.symbols = symbols
+        self.symbol_names = symbol_names
+        self.prices = prices
+        self.quantities = quantities
+        self.buyers = buyers
+        self.sellers = sellers
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+def _cut_at(timestamps: np.ndarray, time_limit: int) -> int:
+    # Rows are read until the first timestamp above the limit
+    over = np.flatnonzero(timestamps > time_limit)
+    if len(over) == 0:
+        return len(timestamps)
+    return int(over[0])
+
+
+def _encode(values: np.ndarray) -> tuple[np.ndarray, list[str]]:
+    # Dictionary encoding that keeps first-seen order of the values
+    uniques, first_seen, codes = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first_seen, kind='stable')
+    remap = np.empty(len(order), dtype=np.int32)
+    remap[order] = np.arange(len(order), dtype=np.int32)
+    return remap[codes.reshape(-1)], [str(uniques[i]) for i in order]
+
+
+def _int_levels(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    return np.nan_to_num(df[columns].to_numpy(dtype=np.float64), nan=0.0).astype(np.int32)
+
+
+def prices_from_frame(df_prices: pd.DataFrame, time_limit: int) -> DayPrices:
+    timestamps = df_prices['timestamp'].to_numpy(dtype=np.int64)
+    n = _cut_at(timestamps, time_limit)
+    df = df_prices.iloc[:n]
+    products, symbols = _encode(df['product'].to_numpy(dtype=str))
+    products = products.astype(np.int16)
+    return DayPrices(
+        timestamps[:n],
+        products,
+        symbols,
+        _int_levels(df, BID_PRICE_COLUMNS),
+        _int_levels(df, BID_VOLUME_COLUMNS),
+        _int_levels(df, ASK_PRICE_COLUMNS),
+        _int_levels(df, ASK_VOLUME_COLUMNS),
+        df['mid_price'].to_numpy(dtype=np.float64),
+    )
+
+
+def trades_from_frame(df_trades: pd.DataFrame, time_limit: int) -> DayTrades:
+    timestamps = df_trades['timestamp'].to_numpy(dtype=np.int64)
+    n = _cut_at(timestamps, time_limit)
+    df = df_trades.iloc[:n]
+    symbols, symbol_names = _encode(df['symbol'].to_numpy(dtype=str))
+    # files without names have empty buyer/seller columns, they end up as 'nan'
+    people = np.concatenate((df['buyer'].astype(str).to_numpy(dtype=str), df['seller'].astype(str).to_numpy(dtype=str)))
+    people_codes, names = _encode(people)
+    return DayTrades(
+        timestamps[:n],
+        symbols.astype(np.int16),
+        symbol_names,
+        df['price'].to_numpy(dtype=np.float64),
+        df['quantity'].to_numpy(dtype=np.int32),
+        people_codes[:n],
+        people_codes[n:],
+        names,
+    )
+
+
+class BookIndex:
+    # Dense (timestamp index, symbol index) arrays of the top of the book,
+    # computed once per day. Missing sides are 0 in best_bid/best_ask and
+    # nan in mid. nearest_mid is the mid of the closest earlier timestamp with
+    # both sides quoted (the closest later one at the start of the day), this
+    # is the mark price for positions.
+    def __init__(self, prices: DayPrices):
+        self.times = prices.times
+        self.symbols = prices.symbols
+        self.index: dict[int, int] = dict(zip(prices.times.tolist(), range(len(prices.times))))
+        self.columns: dict[str, int] = dict(zip(prices.symbols, range(len(prices.symbols))))
+        shape = (len(prices.times), len(prices.symbols))
+
+        rows = np.repeat(np.arange(len(prices.times)), prices.group_ends - prices.group_starts)
+        cols = np.asarray(prices.products, dtype=np.int64)
+        bid_prices = np.where(prices.bid_prices > 0, prices.bid_prices, np.iinfo(np.int32).min).max(axis=1)
+        ask_prices = np.where(prices.ask_prices > 0, prices.ask_prices, np.iinfo(np.int32).max).min(axis=1)
+        self.best_bid = np.zeros(shape, dtype=np.int64)
+        self.best_ask = np.zeros(shape, dtype=np.int64)
+        self.best_bid[rows, cols] = np.where(bid_prices > 0, bid_prices, 0)
+        self.best_ask[rows, cols] = np.where(ask_prices < np.iinfo(np.int32).max, ask_prices, 0)
+
+        quoted = (self.best_bid > 0) & (self.best_ask > 0)
+        self.mid = np.where(quoted, (self.best_bid + self.best_ask) / 2, np.nan)
+        self.nearest_mid = _fill_nan(self.mid)
+        self._columns_cache: dict[tuple[str, ...], list[int]] = {}
+
+    def mids_at(self, time: int, symbols: list[str]) -> dict[str, float]:
+        key = tuple(symbols)
+        cols = self._columns_cache.get(key)
+        if cols is None:
+            cols = [self.columns[symbol] for symbol in symbols]
+            self._columns_cache[key] = cols
+        return dict(zip(symbols, self.nearest_mid[self.index[time], cols].tolist()))
+
+
+def _fill_nan(values: np.ndarray) -> np.ndarray:
+    # forward fill along the time axis, then backward fill what is left at the start
+    filled = values.copy()
+    for _ in range(2):
+        valid = ~np.isnan(filled)
+        last = np.where(valid, np.arange(len(filled))[:, None], 0)
+        np.maximum.accumulate(last, axis=0, out=last)
+        filled = np.take_along_axis(filled, last, axis=0)
+        filled = filled[::-1]
+    return filled
+
+
+# On disk cache of the parsed csv files.
+# Every csv gets a directory of .npy files next to it in `.cache`, which
+# is memory-mapped on later runs. The directory name contains a key made
+# from the size and mtime of the csv, so editing the csv invalidates it.
+CACHE_DIR_NAME = '.cache'
+# Bump this if the layout of the cached arrays changes
+CACHE_VERSION = 1
+
+PRICE_ARRAYS = ['timestamps', 'products', 'bid_prices', 'bid_volumes', 'ask_prices', 'ask_volumes', 'mid_prices']
+TRADE_ARRAYS = ['timestamps', 'symbols', 'prices', 'quantities', 'buyers', 'sellers']
+
+
+def cache_path(csv_path: str) -> str:
+    stat = os.stat(csv_path)
+    key = hashlib.sha1(f'{CACHE_VERSION};{stat.st_size};{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path), CACHE_DIR_NAME, f'{stem}-{key}')
+
+
+def _write_cache(path: str, arrays: dict[str, np.ndarray], meta: dict[str, Any]):
+    stem = os.path.basename(path).rsplit('-', 1)[0]
+    # drop entries of older versions of the same csv
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f'{stem}-*')):
+        if stale != path and not stale.endswith('.tmp'):
+            shutil.rmtree(stale, ignore_errors=True)
+    tmp_path = f'{path}-{os.getpid()}.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process was faster
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _read_cache(path: str, names: list[str]) -> tuple[dict[str, np.ndarray], dict[str, Any]] | None:
+    if not os.path.isdir(path):
+        return None
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in names}
+    return arrays, meta
+
+
+def slice_prices(prices: DayPrices, time_limit: int) -> DayPrices:
+    n = _cut_at(prices.timestamps, time_limit)
+    if n == len(prices):
+        return prices
+    return DayPrices(prices.timestamps[:n], prices.products[:n], prices.symbols,
+                     prices.bid_prices[:n], prices.bid_volumes[:n], prices.ask_prices[:n],
+                     prices.ask_volumes[:n], prices.mid_prices[:n])
+
+
+def slice_trades(trades: DayTrades, time_limit: int) -> DayTrades:
+    n = _cut_at(trades.timestamps, time_limit)
+    if n == len(trades):
+        return trades
+    return DayTrades(trades.timestamps[:n], trades.symbols[:n], trades.symbol_names, trades.prices[:n],
+                     trades.quantities[:n], trades.buyers[:n], trades.sellers[:n], trades.names)
+
+
+def _merge_names(names: list[list[str]]) -> tuple[list[np.ndarray], list[str]]:
+    # the dictionaries of several days merged into one, with the array that
+    # maps the codes of each day to the merged codes
+    index: dict[str, int] = {}
+    remaps = [np.array([index.setdefault(name, len(index)) for name in day_names], dtype=np.int64) for day_names in names]
+    return remaps, list(index)
+
+
+def concat_days(days: list[tuple[DayPrices, DayTrades]], time_delta: int) -> tuple[DayPrices, DayTrades, list[int]]:
+    # Puts several days back to back into one DayPrices/DayTrades. Each day
+    # is shifted so that it starts `time_delta` after the last timestamp of
+    # the previous one, the timestamps stay evenly spaced and increasing.
+    # Also returns the offset that was added to each day.
+    offsets = []
+    start = 0
+    for prices, _ in days:
+        offsets.append(start - int(prices.times[0]))
+        start = offsets[-1] + int(prices.times[-1]) + time_delta
+    all_prices = [prices for prices, _ in days]
+    all_trades = [trades for _, trades in days]
+    remaps, symbols = _merge_names([p.symbols for p in all_prices])
+    products = np.concatenate([remap[p.products] for p, remap in zip(all_prices, remaps)]).astype(all_prices[0].products.dtype)
+    prices = DayPrices(
+        np.concatenate([p.timestamps + offset for p, offset in zip(all_prices, offsets)]),
+        products,
+        symbols,
+        np.concatenate([p.bid_prices for p in all_prices]),
+        np.concatenate([p.bid_volumes for p in all_prices]),
+        np.concatenate([p.ask_prices for p in all_prices]),
+        np.concatenate([p.ask_volumes for p in all_prices]),
+        np.concatenate([p.mid_prices for p in all_prices]),
+    )
+    symbol_remaps, symbol_names = _merge_names([t.symbol_names for t in all_trades])
+    name_remaps, names = _merge_names([t.names for t in all_trades])
+
+    def recoded(column: str, remaps: list[np.ndarray]) -> np.ndarray:
+        dtype = getattr(all_trades[0], column).dtype
+        return np.concatenate([remap[getattr(t, column)] for t, remap in zip(all_trades, remaps)]).astype(dtype)
+
+    trades = DayTrades(
+        np.concatenate([t.timestamps + offset for t, offset in zip(all_trades, offsets)]),
+        recoded('symbols', symbol_remaps),
+        symbol_names,
+        np.concatenate([t.prices for t in all_trades]),
+        np.concatenate([t.quantities for t in all_trades]),
+        recoded('buyers', name_remaps),
+        recoded('sellers', name_remaps),
+        names,
+    )
+    return prices, trades, offsets
+
+
+def load_prices(csv_path: str, time_limit: int = 999900, use_cache=True) -> DayPrices:
+    if not use_cache:
+        return prices_from_frame(pd.read_csv(csv_path, sep=';'), time_limit)
+    path = cache_path(csv_path)
+    cached = _read_cache(path, PRICE_ARRAYS)
+    if cached is None:
+        full = prices_from_frame(pd.read_csv(csv_path, sep=';'), np.iinfo(np.int64).max)
+        _write_cache(path, {name: getattr(full, name) for name in PRICE_ARRAYS}, { 'symbols': full.symbols })
+        return slice_prices(full, time_limit)
+    arrays, meta = cached
+    return slice_prices(DayPrices(symbols=meta['symbols'], **arrays), time_limit)
+
+
+def load_trades(csv_path: str, time_limit: int = 999900, use_cache=True) -> DayTrades:
+    if not use_cache:
+        return trades_from_frame(pd.read_csv(csv_path, sep=';', dtype={ 'seller': str, 'buyer': str }), time_limit)
+    path = cache_path(csv_path)
+    cached = _read_cache(path, TRADE_ARRAYS)
+    if cached is None:
+        df_trades = pd.read_csv(csv_path, sep=';', dtype={ 'seller': str, 'buyer': str })
+        full = trades_from_frame(df_trades, np.iinfo(np.int64).max)
+        _write_cache(path, {name: getattr(full, name) for name in TRADE_ARRAYS}, { 'symbol_names': full.symbol_names, 'names': full.names })
+        return slice_trades(full, time_limit)
+    arrays, meta = cached
+    return slice_trades(DayTrades(symbol_names=meta['symbol_names'], names=meta['names'], **arrays), time_limit)
+
+
+# Shared memory copies of a day, for running many simulations of the same
+# day in worker processes. The parent packs the arrays of a DayPrices and
+# DayTrades into one shared memory block once, workers attach to it by
+# name and get numpy views on the block without copying anything.
+class SharedDay:
+    def __init__(self, prices: DayPrices, trades: DayTrades):
+        arrays = {f'prices.{name}': getattr(prices, name) for name in PRICE_ARRAYS}
+        arrays.update({f'trades.{name}': getattr(trades, name) for name in TRADE_ARRAYS})
+        layout = []
+        size = 0
+        for key, array in arrays.items():
+            # 64 byte alignment keeps every array cache line aligned
+            size = (size + 63) // 64 * 64
+            layout.append((key, array.dtype.str, array.shape, size))
+            size += array.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for key, dtype, shape, offset in layout:
+            np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)[...] = arrays[key]
+        # everything a worker needs to attach, small and picklable
+        self.descriptor = {
+            'name': self.shm.name,
+            'layout': layout,
+            'symbols': prices.symbols,
+            'symbol_names': trades.symbol_names,
+            'names': trades.names,
+        }
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> 'SharedDay':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# blocks this process attached to, by name, they have to stay open as long
+# as arrays point into them
+_attached: dict[str, tuple[shared_memory.SharedMemory, DayPrices, DayTrades]] = {}
+
+def attach_shared_day(descriptor: dict[str, Any]) -> tuple[DayPrices, DayTrades]:
+    attached = _attached.get(descriptor['name'])
+    if attached is None:
+        try:
+            shm = shared_memory.SharedMemory(name=descriptor['name'], track=False)
+        except TypeError:
+            # before python 3.13 attaching registers the block again with the
+            # resource tracker, pool workers share the tracker of the parent,
+            # so this is a no-op and the parent stays in charge of unlinking
+            shm = shared_memory.SharedMemory(name=descriptor['name'])
+        arrays = {}
+        for key, dtype, shape, offset in descriptor['layout']:
+            array = np.ndarray(tuple(shape), dtype=dtype, buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            arrays[key] = array
+        prices = DayPrices(symbols=descriptor['symbols'], **{name: arrays[f'prices.{name}'] for name in PRICE_ARRAYS})
+        trades = DayTrades(symbol_names=descriptor['symbol_names'], names=descriptor['names'], **{name: arrays[f'trades.{name}'] for name in TRADE_ARRAYS})
+        attached = (shm, prices, trades)
+        _attached[descriptor['name']] = attached
+    return attached[1], attached[2]
+
+
+@contextmanager
+def gc_paused():
+    # Building many small objects in bulk triggers the cyclic collector over
+    # and over, none of these objects form cycles, so pause it meanwhile
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def build_states(prices: DayPrices, positionable: list[str]) -> dict[int, TradingState]:
+    with gc_paused():
+        return _build_states(prices, positionable)
+
+
+def _build_states(prices: DayPrices, positionable: list[str]) -> dict[int, TradingState]:
+    states = {}
+    # plain python lists are a lot faster to index than numpy scalars
+    rows = _RowLists(prices, 0, len(prices))
+    positionable_codes = positionable_codes_of(prices, positionable)
+    for time, start, end in zip(prices.times.tolist(), prices.group_starts.tolist(), prices.group_ends.tolist()):
+        states[time] = _make_state(time, prices.symbols, rows, start, end, positionable_codes)
+    return states
+
+
+def positionable_codes_of(prices: DayPrices, positionable: list[str]) -> set[int]:
+    return set(i for i, symbol in enumerate(prices.symbols) if symbol in positionable)
+
+
+class _RowLists:
+    # rows start..end of a DayPrices as python lists
+    def __init__(self, prices: DayPrices, start: int, end: int):
+        self.products = prices.products[start:end].tolist()
+        self.bid_prices = prices.bid_prices[start:end].tolist()
+        self.bid_volumes = prices.bid_volumes[start:end].tolist()
+        self.ask_prices = prices.ask_prices[start:end].tolist()
+        self.ask_volumes = prices.ask_volumes[start:end].tolist()
+        self.mid_prices = prices.mid_prices[start:end].tolist()
+
+
+def _make_state(time: int, symbols: list[str], rows: _RowLists, start: int, end: int, positionable_codes: set[int]) -> TradingState:
+    position: Dict[Product, Position] = {}
+    own_trades: Dict[Symbol, List[Trade]] = {}
+    market_trades: Dict[Symbol, List[Trade]] = {}
+    observations: Dict[Product, Observation] = {}
+    listings = {}
+    depths = {}
+    for row in range(start, end):
+        code = rows.products[row]
+        product = symbols[code]
+        if code in positionable_codes and product not in position:
+            position[product] = 0
+            own_trades[product] = []
+            market_trades[product] = []
+        listings[product] = Listing(product, product, "1")
+        if product == "DOLPHIN_SIGHTINGS":
+            observations["DOLPHIN_SIGHTINGS"] = rows.mid_prices[row]
+
+        depth = OrderDepth()
+        for price, volume in zip(rows.bid_prices[row], rows.bid_volumes[row]):
+            if price > 0:
+                depth.buy_orders[price] = volume
+        for price, volume in zip(rows.ask_prices[row], rows.ask_volumes[row]):
+            if price > 0:
+                depth.sell_orders[price] = -volume
+        depths[product] = depth
+    return TradingState(time, listings, depths, own_trades, market_trades, position, observations)
+
+
+def _append_market_trades(market_trades: Dict[Symbol, List[Trade]], trades: DayTrades, start: int, end: int):
+    symbols = [trades.symbol_names[code] for code in trades.symbols[start:end].tolist()]
+    buyers = [trades.names[code] for code in trades.buyers[start:end].tolist()]
+    sellers = [trades.names[code] for code in trades.sellers[start:end].tolist()]
+    for time, symbol, price, quantity, buyer, seller in zip(
+            trades.timestamps[start:end].tolist(), symbols, trades.prices[start:end].tolist(),
+            trades.quantities[start:end].tolist(), buyers, sellers):
+        if symbol not in market_trades:
+            market_trades[symbol] = []
+        market_trades[symbol].append(Trade(symbol, price, quantity, buyer, seller, time))
+
+
+def add_market_trades(trades: DayTrades, states: dict[int, TradingState]) -> dict[int, TradingState]:
+    with gc_paused():
+        # trades files are sorted by time, so each timestamp is one slice
+        times = trades.timestamps
+        bounds = np.flatnonzero(np.diff(times)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        ends = np.concatenate((bounds, [len(times)])).tolist()
+        for start, end in zip(starts, ends):
+            if end > start:
+                _append_market_trades(states[int(times[start])].market_trades, trades, start, end)
+    return states
+
+
+class DayStates(Mapping):
+    # Read-only mapping timestamp -> TradingState, that builds each state
+    # from the columnar data when it is accessed instead of keeping the whole
+    # day in memory. Only the `keep` most recently used states are held on to,
+    # changes made to a state (own_trades, position) survive as long as it is
+    # one of them. Iterating it streams the day one timestamp at a time.
+    def __init__(self, prices: DayPrices, trades: DayTrades | None, positionable: list[str], keep: int = 8):
+        self.prices = prices
+        self.trades = trades
+        self.positionable = positionable
+        self.keep = keep
+        self._positionable_codes = positionable_codes_of(prices, positionable)
+        self._index: dict[int, int] = dict(zip(prices.times.tolist(), range(len(prices.times))))
+        self._trade_starts = None
+        if trades is not None:
+            self._trade_starts = np.searchsorted(trades.timestamps, prices.times, side='left')
+            self._trade_ends = np.searchsorted(trades.timestamps, prices.times, side='right')
+        self._recent: OrderedDict[int, TradingState] = OrderedDict()
+
+    def __getitem__(self, time: int) -> TradingState:
+        state = self._recent.get(time)
+        if state is not None:
+            self._recent.move_to_end(time)
+            return state
+        state = self._build(self._index[time])
+        self._recent[time] = state
+        if len(self._recent) > self.keep:
+            self._recent.popitem(last=False)
+        return state
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, time) -> bool:
+        return time in self._index
+
+    def _build(self, i: int) -> TradingState:
+        start = int(self.prices.group_starts[i])
+        end = int(self.prices.group_ends[i])
+        time = int(self.prices.times[i])
+        state = _make_state(time, self.prices.symbols, _RowLists(self.prices, start, end), 0, end - start, self._positionable_codes)
+        if self._trade_starts is not None:
+            _append_market_trades(state.market_trades, self.trades, int(self._trade_starts[i]), int(self._trade_ends[i]))
+        return state
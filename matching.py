@@ -0,0 +1,109 @@
+from datamodel import Order, OrderDepth, Trade
+
+
+class BookSide:
+    # One side of an OrderDepth as price levels sorted by priority (best
+    # first). Volumes are positive. Matched volume is only written to
+    # `taken`, so the OrderDepth the trader saw is never copied or changed.
+    def __init__(self, levels: dict[int, int], descending: bool):
+        self.prices = sorted(levels, reverse=descending)
+        self.volumes = [abs(levels[price]) for price in self.prices]
+        self.taken: dict[int, int] = {}
+
+    def sweep(self, limit_price: int, quantity: int, crosses) -> list[tuple[int, int]]:
+        # Takes up to `quantity` from the levels `crosses(level_price, limit_price)`
+        # in price priority, returns the (price, volume) fills
+        fills = []
+        for i, price in enumerate(self.prices):
+            if quantity <= 0 or not crosses(price, limit_price):
+                break
+            available = self.volumes[i] - self.taken.get(i, 0)
+            if available <= 0:
+                continue
+            volume = min(available, quantity)
+            self.taken[i] = self.taken.get(i, 0) + volume
+            quantity -= volume
+            fills.append((price, volume))
+        return fills
+
+
+def aggregate_orders(orders: list[Order]) -> list[Order]:
+    # Sums up the orders of one symbol per price level in a single pass,
+    # buys and sells at the same price are kept apart. The result has one
+    # order per (side, price), in the order the levels were first seen.
+    buys: dict[int, int] = {}
+    sells: dict[int, int] = {}
+    first_seen: list[tuple[bool, int]] = []
+    symbol = None
+    for order in orders:
+        symbol = order.symbol
+        if order.quantity > 0:
+            if order.price not in buys:
+                buys[order.price] = 0
+                first_seen.append((True, order.price))
+            buys[order.price] += order.quantity
+        elif order.quantity < 0:
+            if order.price not in sells:
+                sells[order.price] = 0
+                first_seen.append((False, order.price))
+            sells[order.price] += order.quantity
+    return [Order(symbol, price, buys[price] if is_buy else sells[price]) for is_buy, price in first_seen]
+
+
+def _at_or_below(price: int, limit: int) -> bool:
+    return price <= limit
+
+def _at_or_above(price: int, limit: int) -> bool:
+    return price >= limit
+
+
+def match_orders(symbol: str, orders: list[Order], depth: OrderDepth, time: int, halfway: bool) -> tuple[list[Trade], list[Order]]:
+    # Matches the orders of one symbol against the book of this timestamp.
+    # A buy takes the asks at or below its price, cheapest first, a sell
+    # takes the bids at or above its price, highest first. Each fill trades at
+    # the price of the level it took. Orders of the same step share the book,
+    # volume taken by one order is gone for the next.
+    # With halfway, an order is filled completely at its own price if it is
+    # on the far side of the mid price, regardless of the volume in the book.
+    # Returns the trades and the orders (or remainders) that were not filled.
+    trades = []
+    unmatched = []
+    asks = None
+    bids = None
+    mid = None
+    if halfway and len(depth.buy_orders) > 0 and len(depth.sell_orders) > 0:
+        mid = (max(depth.buy_orders) + min(depth.sell_orders)) / 2
+    for order in orders:
+        if order.quantity > 0:
+            if halfway:
+                if mid is not None and order.price >= mid:
+                    trades.append(Trade(symbol, order.price, order.quantity, "YOU", "BOT", time))
+                else:
+                    unmatched.append(order)
+                continue
+            if asks is None:
+                asks = BookSide(depth.sell_orders, False)
+            fills = asks.sweep(order.price, order.quantity, _at_or_below)
+            filled = 0
+            for price, volume in fills:
+                trades.append(Trade(symbol, price, volume, "YOU", "BOT", time))
+                filled += volume
+            if filled < order.quantity:
+                unmatched.append(Order(symbol, order.price, order.quantity - filled))
+        elif order.quantity < 0:
+            if halfway:
+                if mid is not None and order.price <= mid:
+                    trades.append(Trade(symbol, order.price, order.quantity, "BOT", "YOU", time))
+                else:
+                    unmatched.append(order)
+                continue
+            if bids is None:
+                bids = BookSide(depth.buy_orders, True)
+            fills = bids.sweep(order.price, -order.quantity, _at_or_above)
+            filled = 0
+            for price, volume in fills:
+                trades.append(Trade(symbol, price, -volume, "BOT", "YOU", time))
+                filled += volume
+            if filled < -order.quantity:
+                unmatched.append(Order(symbol, order.price, order.quantity + filled))
+    return trades, unmatched
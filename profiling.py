@@ -0,0 +1,108 @@
+# Where the time of a simulation goes.
+# StageTimer attributes the time between two lap() calls to the named
+# stage, the simulation loop calls lap() after each of its stages. When
+# profiling is off the loop gets NULL_TIMER, whose lap() does nothing.
+# With cProfile on top, run_profiled() writes the pstats file and a
+# collapsed stack file for flamegraph.pl or speedscope.
+import cProfile
+import pstats
+import time
+from typing import Callable
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + now - self.last
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self.last = now
+
+    def reset(self):
+        # the time until the next lap() is not counted
+        self.last = time.perf_counter()
+
+    def summary(self) -> list[tuple[str, float, int]]:
+        # (stage, seconds, calls), slowest first
+        return sorted(((stage, seconds, self.calls[stage]) for stage, seconds in self.seconds.items()), key=lambda row: -row[1])
+
+    def print_summary(self):
+        total = sum(self.seconds.values())
+        print(f'{"stage":<20}{"seconds":>10}{"share":>8}{"calls":>8}{"per call (us)":>15}')
+        for stage, seconds, calls in self.summary():
+            print(f'{stage:<20}{seconds:>10.3f}{seconds / total if total else 0.0:>8.1%}{calls:>8}{seconds / calls * 1e6:>15.1f}')
+        print(f'{"total":<20}{total:>10.3f}')
+
+
+class NullTimer:
+    def lap(self, stage: str):
+        pass
+
+    def reset(self):
+        pass
+
+    def print_summary(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def run_profiled(fn: Callable, output: str):
+    # runs fn() under cProfile, writes <output>.pstats and <output>.collapsed
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn)
+    finally:
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(f'{output}.pstats')
+        write_collapsed(stats, f'{output}.collapsed')
+        print(f'Profile written to {output}.pstats and {output}.collapsed')
+
+
+def _label(func: tuple[str, int, str]) -> str:
+    file_name, line, name = func
+    if file_name == '~':
+        return name
+    return f'{name} ({file_name.rsplit("/", 1)[-1]}:{line})'
+
+
+def write_collapsed(stats: pstats.Stats, path: str):
+    # Collapsed stacks ('a;b;c microseconds' per line) rebuilt from the
+    # caller -> callee edges of the profile. cProfile keeps no full stacks,
+    # so a function called from several places has its time split between
+    # them in proportion to the time spent in each call site.
+    entries = stats.stats
+    children: dict[tuple, list[tuple]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            children.setdefault(caller, []).append(func)
+    lines: dict[str, float] = {}
+
+    def walk(func: tuple, stack: list[str], share: float, path: set):
+        tottime = entries[func][2]
+        labels = stack + [_label(func)]
+        key = ';'.join(labels)
+        lines[key] = lines.get(key, 0.0) + tottime * share
+        for child in children.get(func, []):
+            if child in path:
+                continue
+            # cumulative time of child spent in calls from func
+            edge = entries[child][4][func][3]
+            # paths below a microsecond are dropped, they would not show anyway
+            if share * edge < 1e-6:
+                continue
+            walk(child, labels, share * edge / entries[child][3], path | {child})
+
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    for root in roots:
+        walk(root, [], 1.0, {root})
+    with open(path, 'w') as f:
+        for key, seconds in lines.items():
+            microseconds = int(seconds * 1e6)
+            if microseconds > 0:
+                f.write(f'{key} {microseconds}\n')
@@ -0,0 +1,174 @@
+# Parameter sweeps over a Trader.
+#   python sweep.py --trader starter:Trader --grid PRICE_WINDOW_SIZE=5,10,20 threshold_prices.AMETHYSTS.buy=9990,9995
+#   python sweep.py --trader my_algo:Trader --random 40 --grid EDGE=1:5 SIZE=5,10,20 --halving 250000,500000
+# A parameter is either a keyword argument of Trader.__init__, or an
+# attribute that is set on the fresh Trader. Dotted names go into nested
+# dicts, e.g. threshold_prices.AMETHYSTS.buy sets trader.threshold_prices['AMETHYSTS']['buy'].
+import argparse
+import copy
+import inspect
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+import pandas as pd
+
+from backtester import simulate_alternative, training_days
+from batch import load_trader_class, silenced, shared_days
+from market_data import attach_shared_day
+
+
+def make_trader(trader_class, params: dict[str, Any]):
+    accepted = inspect.signature(trader_class.__init__).parameters
+    kwargs = { key: value for key, value in params.items() if key in accepted }
+    trader = trader_class(**kwargs)
+    set_params(trader, { key: value for key, value in params.items() if key not in kwargs })
+    return trader
+
+
+def set_params(trader, params: dict[str, Any]):
+    # sets attributes of the trader, dotted names go into nested dicts
+    for key, value in params.items():
+        name, *path = key.split('.')
+        if not path:
+            setattr(trader, name, value)
+            continue
+        # copy before changing, nested dicts may be shared class attributes
+        target = copy.deepcopy(getattr(trader, name))
+        setattr(trader, name, target)
+        for part in path[:-1]:
+            target = target[part]
+        target[path[-1]] = value
+
+
+def grid(spec: dict[str, list]) -> list[dict[str, Any]]:
+    keys = list(spec)
+    return [dict(zip(keys, values)) for values in itertools.product(*(spec[key] for key in keys))]
+
+
+def random_search(spec: dict[str, list | tuple], trials: int, seed=0) -> list[dict[str, Any]]:
+    # lists are sampled from, (low, high) tuples uniformly (ints stay ints)
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(trials):
+        params = {}
+        for key, values in spec.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[key] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                params[key] = rng.choice(values)
+        candidates.append(params)
+    return candidates
+
+
+def evaluate(trader_class, params: dict[str, Any], days: list[tuple[int, int]], time_limit=999900, names=True, halfway=False,
+             shared: dict[tuple[int, int, bool], dict] | None = None) -> dict[str, Any]:
+    # Total pnl of one parameter set over `days`, every day with a fresh Trader.
+    # `shared` maps (round, day, names) to days in shared memory.
+    start = time.perf_counter()
+    result = dict(params)
+    total = 0.0
+    for round, day in days:
+        trader = make_trader(trader_class, params)
+        data = attach_shared_day(shared[(round, day, names)]) if shared else None
+        with silenced():
+            ledger = simulate_alternative(round, day, trader, time_limit, names, halfway, log=False, data=data)
+        pnl = ledger.total()
+        result[f'pnl_{round}_{day}'] = pnl
+        total += pnl
+    result['pnl'] = total
+    result['time_limit'] = time_limit
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_trials(trader_class, candidates: list[dict[str, Any]], days: list[tuple[int, int]], time_limit=999900,
+               names=True, halfway=False, workers: int | None = None, results_path: str | None = None,
+               shared: dict[tuple[int, int, bool], dict] | None = None) -> pd.DataFrame:
+    # Evaluates every candidate, appends each result to `results_path` as
+    # soon as it is done and returns all of them ranked by pnl
+    rows = []
+    header = not (results_path and os.path.exists(results_path))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate, trader_class, params, days, time_limit, names, halfway, shared) for params in candidates]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            if results_path:
+                pd.DataFrame([row]).to_csv(results_path, mode='a', header=header, index=False)
+                header = False
+            print(f'[{len(rows)}/{len(candidates)}] pnl {row["pnl"]:.1f} {({ k: row[k] for k in candidates[0] })}', file=sys.stderr)
+    return pd.DataFrame(rows).sort_values('pnl', ascending=False, ignore_index=True)
+
+
+def sweep(trader_class, candidates: list[dict[str, Any]], days: list[tuple[int, int]] | None = None,
+          rungs: list[int] | None = None, keep=0.5, names=True, halfway=False,
+          workers: int | None = None, results_path: str | None = None) -> pd.DataFrame:
+    # Successive halving: all candidates run up to the first time limit in
+    # `rungs`, only the best `keep` fraction continues to the next one, and
+    # so on until the full day. Clearly losing parameter sets are dropped
+    # after a fraction of the day instead of being simulated to the end.
+    if days is None:
+        days = training_days()
+    rungs = sorted(rungs or []) + [999900]
+    results = []
+    # every day is parsed once and shared with all workers
+    with shared_days([(round, day, names) for round, day in days]) as shared:
+        for i, time_limit in enumerate(rungs):
+            ranked = run_trials(trader_class, candidates, days, time_limit, names, halfway, workers, results_path, shared)
+            results.append(ranked)
+            if i < len(rungs) - 1:
+                survivors = max(1, int(len(ranked) * keep))
+                candidates = [{ key: row[key] for key in candidates[0] } for row in ranked.head(survivors).to_dict('records')]
+    # the final rung on top, then the ones that were dropped earlier
+    return pd.concat(results[::-1], ignore_index=True).drop_duplicates(subset=list(candidates[0]), keep='first')
+
+
+def _parse_values(text: str) -> list | tuple:
+    # 'a,b,c' -> list, 'low:high' -> range for random search
+    def number(value: str):
+        for kind in (int, float):
+            try:
+                return kind(value)
+            except ValueError:
+                pass
+        return value
+    if ':' in text and ',' not in text:
+        low, high = text.split(':')
+        return (number(low), number(high))
+    return [number(value) for value in text.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Grid/random search over Trader parameters.')
+    parser.add_argument('--trader', required=True, help="trader class as 'module:Class'")
+    parser.add_argument('--grid', nargs='+', required=True, help="NAME=v1,v2,... (or NAME=low:high with --random)")
+    parser.add_argument('--random', type=int, help='sample this many candidates instead of the full grid')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--days', nargs='*', help="days as 'round:day', default: all days in the training folder")
+    parser.add_argument('--halving', help='comma separated time limits for successive halving, e.g. 250000,500000')
+    parser.add_argument('--keep', type=float, default=0.5, help='fraction of candidates kept per halving rung')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-names', action='store_true')
+    parser.add_argument('--halfway', action='store_true')
+    parser.add_argument('--out', default='sweep_results.csv', help='results are appended here as they finish')
+    args = parser.parse_args()
+
+    spec = {}
+    for item in args.grid:
+        key, _, values = item.partition('=')
+        spec[key] = _parse_values(values)
+    if args.random:
+        candidates = random_search(spec, args.random, args.seed)
+    else:
+        candidates = grid({ key: list(range(values[0], values[1] + 1)) if isinstance(values, tuple) else values for key, values in spec.items() })
+    days = [tuple(int(x) for x in day.split(':')) for day in args.days] if args.days else None
+    rungs = [int(x) for x in args.halving.split(',')] if args.halving else None
+    table = sweep(load_trader_class(args.trader), candidates, days, rungs, args.keep, not args.no_names, args.halfway, args.workers, args.out)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.head(20))
@@ -0,0 +1,165 @@
+# Several traders on one day, side by side.
+#   python tournament.py --round 1 --day -1 --traders starter:Trader Trader:Trader dontlooseshells_algo:Trader
+# The day is loaded and its book and mark prices are computed once, each
+# state is built once and every trader gets its own view of it: the book
+# and market trades are shared, position and own_trades are the trader's,
+# and the order depths are copied so one trader changing them does not
+# affect the others. Every trader has its own ledger, run monitor,
+# diagnostics and optionally log, and all traders take one step before
+# the next timestamp.
+import argparse
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from backtester import SYMBOLS_BY_ROUND, SYMBOLS_BY_ROUND_POSITIONABLE, load_day, run_steps
+from batch import load_trader_class, silenced
+from datamodel import OrderDepth, TradingState
+from diagnostics import Diagnostics, LIMIT_BREACH
+from instrumentation import RunMonitor
+from ledger import PnLLedger
+from log_writer import LogWriter, new_log_path
+from market_data import BookIndex, DayPrices, DayStates, DayTrades, slice_prices, slice_trades
+from trade_store import TradeStore
+
+
+def _copy_depth(depth: OrderDepth) -> OrderDepth:
+    copied = OrderDepth()
+    copied.buy_orders = dict(depth.buy_orders)
+    copied.sell_orders = dict(depth.sell_orders)
+    return copied
+
+
+class TraderStates(Mapping):
+    # One trader's states on top of the shared DayStates. Like DayStates it
+    # keeps the `keep` most recently used states, which is where the position
+    # and own_trades of the next timestamp wait until that step.
+    def __init__(self, shared: DayStates, keep: int = 4):
+        self.shared = shared
+        self.keep = keep
+        self._recent: OrderedDict[int, TradingState] = OrderedDict()
+
+    def __getitem__(self, time: int) -> TradingState:
+        state = self._recent.get(time)
+        if state is not None:
+            return state
+        shared = self.shared[time]
+        state = TradingState(
+            time,
+            shared.listings,
+            { symbol: _copy_depth(depth) for symbol, depth in shared.order_depths.items() },
+            { symbol: [] for symbol in shared.own_trades },
+            shared.market_trades,
+            dict(shared.position),
+            shared.observations,
+        )
+        self._recent[time] = state
+        if len(self._recent) > self.keep:
+            self._recent.popitem(last=False)
+        return state
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.shared)
+
+    def __len__(self) -> int:
+        return len(self.shared)
+
+    def __contains__(self, time) -> bool:
+        return time in self.shared
+
+
+class Entry:
+    # a trader in the tournament and everything that is its own
+    def __init__(self, name: str, trader, states: TraderStates, ledger: PnLLedger, monitor: RunMonitor,
+                 diagnostics: Diagnostics, log_writer: LogWriter | None):
+        self.name = name
+        self.trader = trader
+        self.states = states
+        self.ledger = ledger
+        self.monitor = monitor
+        self.diagnostics = diagnostics
+        self.log_writer = log_writer
+
+
+def run_tournament(traders: dict[str, object], round: int, day: int, time_limit=999900, names=True, halfway=False,
+                   log=False, data: tuple[DayPrices, DayTrades] | None = None, quiet=True) -> pd.DataFrame:
+    # Returns one row per trader with its final pnl per symbol, the total,
+    # the max drawdown, Trader.run times and the number of limit breaches.
+    # `quiet` drops what the backtester and the traders print.
+    if data is None:
+        prices, trades = load_day(round, day, names, time_limit)
+    else:
+        prices = slice_prices(data[0], time_limit)
+        trades = slice_trades(data[1], time_limit)
+    # all traders are at the same timestamp, keep enough states for all of them
+    shared = DayStates(prices, trades, SYMBOLS_BY_ROUND_POSITIONABLE[round], keep=8)
+    book = BookIndex(prices)
+    ref_symbols = list(shared[int(book.times[0])].position.keys())
+    max_time = int(book.times[-1])
+    store = None
+
+    entries = []
+    for name, trader in traders.items():
+        if hasattr(trader, 'trade_store'):
+            # queries are capped at the current timestamp, which is the same for everyone
+            if store is None:
+                store = TradeStore(trades)
+            trader.trade_store = store
+        ledger = PnLLedger(book.times, ref_symbols)
+        monitor = RunMonitor(len(book.times))
+        log_writer = None
+        if log:
+            log_writer = LogWriter(new_log_path('logs'), day, prices, book, ledger, SYMBOLS_BY_ROUND[round], monitor=monitor)
+        entries.append(Entry(name, trader, TraderStates(shared), ledger, monitor, Diagnostics(), log_writer))
+
+    try:
+        with silenced(quiet):
+            steps = [run_steps(entry.states, book, max_time, entry.ledger, entry.trader, round, halfway,
+                               entry.log_writer, entry.monitor, diagnostics=entry.diagnostics) for entry in entries]
+            for _ in book.times:
+                for step in steps:
+                    next(step)
+    finally:
+        for entry in entries:
+            entry.monitor.close()
+            if entry.log_writer is not None:
+                entry.log_writer.close()
+
+    rows = []
+    for entry in entries:
+        ledger = entry.ledger
+        curve = (ledger.profits + ledger.balance).sum(axis=1)
+        stats = entry.monitor.summary()
+        row = { 'trader': entry.name }
+        row.update(zip(ledger.symbols, (ledger.profits[-1] + ledger.balance[-1]).tolist()))
+        row['TOTAL'] = ledger.total()
+        row['max_drawdown'] = float((np.maximum.accumulate(curve) - curve).max())
+        row['run_mean_ms'] = stats.get('mean_ms', 0.0)
+        row['run_p99_ms'] = stats.get('p99_ms', 0.0)
+        row['limit_breaches'] = int(entry.diagnostics.counts[LIMIT_BREACH].sum())
+        if entry.log_writer is not None:
+            row['log'] = entry.log_writer.path
+        rows.append(row)
+    return pd.DataFrame(rows).sort_values('TOTAL', ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run several traders on one day side by side.')
+    parser.add_argument('--traders', nargs='+', required=True, help="trader classes as 'module:Class'")
+    parser.add_argument('--round', type=int, required=True)
+    parser.add_argument('--day', type=int, required=True)
+    parser.add_argument('--time-limit', type=int, default=999900)
+    parser.add_argument('--no-names', action='store_true', help='use the trades files without bot names')
+    parser.add_argument('--halfway', action='store_true', help='match orders halfway')
+    parser.add_argument('--log', action='store_true', help='write a log file per trader to logs/')
+    parser.add_argument('--verbose', action='store_true', help='show what the traders print')
+    args = parser.parse_args()
+
+    traders = { spec: load_trader_class(spec)() for spec in args.traders }
+    table = run_tournament(traders, args.round, args.day, args.time_limit, not args.no_names, args.halfway, args.log,
+                           quiet=not args.verbose)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table)
@@ -0,0 +1,123 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from market_data import DayTrades
+
+
+class TradeRows(NamedTuple):
+    # arrays of the matching trades in time order, buyers/sellers are codes
+    # into TradeStore.names
+    timestamps: np.ndarray
+    prices: np.ndarray
+    quantities: np.ndarray
+    buyers: np.ndarray
+    sellers: np.ndarray
+
+
+class _NameIndex:
+    # Rows of the store grouped by (name, symbol), in time order within a
+    # group. `names` is the buyer or seller column of the store.
+    def __init__(self, names: np.ndarray, symbols: np.ndarray, timestamps: np.ndarray, n_names: int, n_symbols: int):
+        self.n_symbols = n_symbols
+        keys = names.astype(np.int64) * n_symbols + symbols
+        # the store is sorted by time within a symbol, a stable sort keeps that
+        self.rows = np.argsort(keys, kind='stable')
+        self.timestamps = timestamps[self.rows]
+        self.starts = np.searchsorted(keys[self.rows], np.arange(n_names * n_symbols + 1))
+
+    def rows_between(self, name: int, symbol: int, start: int, end: int) -> np.ndarray:
+        key = name * self.n_symbols + symbol
+        lo, hi = self.starts[key], self.starts[key + 1]
+        times = self.timestamps[lo:hi]
+        return self.rows[lo + np.searchsorted(times, start, 'left'):lo + np.searchsorted(times, end, 'right')]
+
+
+class TradeStore:
+    # The market trades of a day as columns sorted by (symbol, timestamp),
+    # with indexes by buyer and by seller. Time ranges are inclusive.
+    # `until` caps every query, the backtester sets it to the current
+    # timestamp before each Trader.run so a trader cannot look ahead.
+    # A trader that has a `trade_store` attribute gets one injected, e.g.
+    #   net = self.trade_store.net_volume('Camilla', 'BERRIES', state.timestamp - 50000)
+    def __init__(self, trades: DayTrades):
+        order = np.lexsort((trades.timestamps, trades.symbols))
+        self.symbol_names = trades.symbol_names
+        self.names = trades.names
+        self.symbol_codes: dict[str, int] = dict(zip(trades.symbol_names, range(len(trades.symbol_names))))
+        self.name_codes: dict[str, int] = dict(zip(trades.names, range(len(trades.names))))
+        self.symbols = np.asarray(trades.symbols)[order]
+        self.timestamps = np.asarray(trades.timestamps)[order]
+        self.prices = np.asarray(trades.prices)[order]
+        self.quantities = np.asarray(trades.quantities)[order]
+        self.buyers = np.asarray(trades.buyers)[order]
+        self.sellers = np.asarray(trades.sellers)[order]
+        self.symbol_starts = np.searchsorted(self.symbols, np.arange(len(self.symbol_names) + 1))
+        self.by_buyer = _NameIndex(self.buyers, self.symbols, self.timestamps, len(self.names), len(self.symbol_names))
+        self.by_seller = _NameIndex(self.sellers, self.symbols, self.timestamps, len(self.names), len(self.symbol_names))
+        self.until: int | None = None
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _end(self, end: int | None) -> int:
+        if end is None:
+            end = np.iinfo(np.int64).max
+        if self.until is not None:
+            end = min(end, self.until)
+        return end
+
+    def _rows(self, rows) -> TradeRows:
+        return TradeRows(self.timestamps[rows], self.prices[rows], self.quantities[rows], self.buyers[rows], self.sellers[rows])
+
+    def trades(self, symbol: str, start=0, end: int | None = None) -> TradeRows:
+        # all trades of `symbol` in [start, end]
+        code = self.symbol_codes.get(symbol)
+        if code is None:
+            return self._rows(slice(0, 0))
+        lo, hi = self.symbol_starts[code], self.symbol_starts[code + 1]
+        times = self.timestamps[lo:hi]
+        return self._rows(slice(lo + np.searchsorted(times, start, 'left'), lo + np.searchsorted(times, self._end(end), 'right')))
+
+    def _name_rows(self, index: _NameIndex, name: str, symbol: str, start: int, end: int | None) -> np.ndarray:
+        name_code = self.name_codes.get(name)
+        symbol_code = self.symbol_codes.get(symbol)
+        if name_code is None or symbol_code is None:
+            return np.zeros(0, dtype=np.int64)
+        return index.rows_between(name_code, symbol_code, start, self._end(end))
+
+    def bought(self, name: str, symbol: str, start=0, end: int | None = None) -> TradeRows:
+        return self._rows(self._name_rows(self.by_buyer, name, symbol, start, end))
+
+    def sold(self, name: str, symbol: str, start=0, end: int | None = None) -> TradeRows:
+        return self._rows(self._name_rows(self.by_seller, name, symbol, start, end))
+
+    def net_volume(self, name: str, symbol: str, start=0, end: int | None = None) -> int:
+        # bought minus sold quantity
+        bought = self.quantities[self._name_rows(self.by_buyer, name, symbol, start, end)]
+        sold = self.quantities[self._name_rows(self.by_seller, name, symbol, start, end)]
+        return int(bought.sum()) - int(sold.sum())
+
+    def vwap(self, name: str, symbol: str, start=0, end: int | None = None, side: str = 'both') -> float:
+        # volume weighted price of the trades of `name` on side 'buy', 'sell'
+        # or 'both', nan without trades
+        rows = []
+        if side in ('buy', 'both'):
+            rows.append(self._name_rows(self.by_buyer, name, symbol, start, end))
+        if side in ('sell', 'both'):
+            rows.append(self._name_rows(self.by_seller, name, symbol, start, end))
+        rows = np.concatenate(rows)
+        volume = self.quantities[rows].sum()
+        if volume == 0:
+            return float('nan')
+        return float((self.prices[rows] * self.quantities[rows]).sum() / volume)
+
+    def signed_flow(self, name: str, symbol: str, start=0, end: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        # (timestamps, running net volume) of `name` in time order, buys count
+        # positive and sells negative
+        bought = self._name_rows(self.by_buyer, name, symbol, start, end)
+        sold = self._name_rows(self.by_seller, name, symbol, start, end)
+        timestamps = np.concatenate([self.timestamps[bought], self.timestamps[sold]])
+        signed = np.concatenate([self.quantities[bought], -self.quantities[sold]]).astype(np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        return timestamps[order], np.cumsum(signed[order])
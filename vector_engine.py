@@ -0,0 +1,237 @@
+# A fast path to screen many variants of a strategy before running the
+# best ones through simulate_alternative.
+# A strategy here is a function of whole-day numpy arrays of one symbol and
+# a dict of parameters, returning the target position at every timestamp:
+#   def mean_reversion(m: MarketArrays, p: dict[str, np.ndarray]) -> np.ndarray:
+#       mean = rolling_mean(m.mid, 50)
+#       return np.where(m.mid < mean - p['edge'], p['size'], np.where(m.mid > mean + p['edge'], -p['size'], 0))
+#   result = run_vector(mean_reversion, 1, -1, ['BANANAS'], param_grid(edge=[1, 2, 3], size=[5, 10, 20]))
+#   result.top(5)
+#   confirm(mean_reversion, result, 1, -1, ['BANANAS'], n=3)
+# Every parameter is a (P, 1) column, so the same expression gives one
+# (P, T) row of targets per parameter set. The value at timestamp t must
+# only use the arrays up to t, nothing checks that.
+# Targets are clipped to current_limits, at every timestamp the position
+# moves towards the target by buying at the best ask / selling at the best
+# bid, at most their volume, the way the matching engine fills an order at
+# the top of the book. PnL is cash plus the position at the mid price.
+import itertools
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import simulate_alternative, load_day, current_limits, SYMBOLS_BY_ROUND_POSITIONABLE
+from datamodel import Order, TradingState
+from market_data import BookIndex, DayPrices, DayTrades, slice_prices, slice_trades
+
+
+class MarketArrays(NamedTuple):
+    # (T,) arrays of one symbol, missing book sides have price and volume 0
+    times: np.ndarray
+    best_bid: np.ndarray
+    best_ask: np.ndarray
+    bid_volume: np.ndarray
+    ask_volume: np.ndarray
+    # mid of the closest timestamp with both sides quoted
+    mid: np.ndarray
+    # market trades: total volume and volume at or above the mid minus volume below it
+    trade_volume: np.ndarray
+    trade_flow: np.ndarray
+
+
+def _top_volumes(prices: DayPrices, book: BookIndex) -> tuple[np.ndarray, np.ndarray]:
+    # (T, S) volumes at the best bid and the best ask
+    rows = np.repeat(np.arange(len(book.times)), prices.group_ends - prices.group_starts)
+    cols = np.asarray(prices.products, dtype=np.int64)
+    level = np.arange(len(rows))
+    bid_volume = np.zeros(book.best_bid.shape, dtype=np.int64)
+    ask_volume = np.zeros(book.best_ask.shape, dtype=np.int64)
+    bids = np.where(prices.bid_prices > 0, prices.bid_prices, np.iinfo(np.int32).min)
+    asks = np.where(prices.ask_prices > 0, prices.ask_prices, np.iinfo(np.int32).max)
+    bid_volume[rows, cols] = np.abs(prices.bid_volumes[level, bids.argmax(axis=1)])
+    ask_volume[rows, cols] = np.abs(prices.ask_volumes[level, asks.argmin(axis=1)])
+    return np.where(book.best_bid > 0, bid_volume, 0), np.where(book.best_ask > 0, ask_volume, 0)
+
+
+def market_arrays(prices: DayPrices, trades: DayTrades, symbols: list[str]) -> dict[str, MarketArrays]:
+    book = BookIndex(prices)
+    bid_volume, ask_volume = _top_volumes(prices, book)
+    rows = np.searchsorted(book.times, trades.timestamps)
+    inside = rows < len(book.times)
+    arrays = {}
+    for symbol in symbols:
+        s = book.columns[symbol]
+        mid = book.nearest_mid[:, s]
+        volume = np.zeros(len(book.times))
+        flow = np.zeros(len(book.times))
+        if symbol in trades.symbol_names:
+            mask = inside & (trades.symbols == trades.symbol_names.index(symbol))
+            trade_rows = rows[mask]
+            quantities = trades.quantities[mask].astype(np.float64)
+            signs = np.where(trades.prices[mask] >= mid[trade_rows], 1.0, -1.0)
+            volume = np.bincount(trade_rows, quantities, minlength=len(book.times))
+            flow = np.bincount(trade_rows, signs * quantities, minlength=len(book.times))
+        arrays[symbol] = MarketArrays(book.times, book.best_bid[:, s], book.best_ask[:, s],
+                                      bid_volume[:, s], ask_volume[:, s], mid, volume, flow)
+    return arrays
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # mean of the last `window` values (fewer at the start) along the last axis
+    sums = np.cumsum(values, axis=-1)
+    sums[..., window:] = sums[..., window:] - sums[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return sums / counts
+
+
+def param_grid(**values: list) -> dict[str, np.ndarray]:
+    # every combination of the values as one (P,) array per parameter
+    combinations = list(itertools.product(*values.values()))
+    return { name: np.array([combination[k] for combination in combinations]) for k, name in enumerate(values) }
+
+
+def _columns(params: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    return { name: np.asarray(value)[:, None] for name, value in params.items() }
+
+
+def fill_targets(m: MarketArrays, targets: np.ndarray, limit: int) -> tuple[np.ndarray, np.ndarray]:
+    # (P, T) positions and cash when following the targets, one step at a
+    # time over T with all P parameter sets at once. The loop works on (T, P)
+    # arrays so every step reads and writes contiguous rows.
+    if targets.dtype.kind == 'f':
+        targets = np.rint(targets)
+    targets = np.ascontiguousarray(np.clip(targets, -limit, limit).astype(np.int64).T)
+    steps, n = targets.shape
+    positions = np.empty((steps, n), dtype=np.int64)
+    cash = np.empty((steps, n), dtype=np.float64)
+    position = np.zeros(n, dtype=np.int64)
+    paid = np.zeros(n, dtype=np.float64)
+    wanted = np.empty(n, dtype=np.int64)
+    traded = np.empty(n, dtype=np.int64)
+    best_bid, best_ask = m.best_bid.tolist(), m.best_ask.tolist()
+    bid_volume, ask_volume = m.bid_volume.tolist(), m.ask_volume.tolist()
+    for t in range(steps):
+        np.subtract(targets[t], position, out=wanted)
+        if best_ask[t] > 0:
+            # buy up to the volume at the best ask
+            np.minimum(wanted, ask_volume[t], out=traded)
+            np.maximum(traded, 0, out=traded)
+            position += traded
+            paid -= traded * best_ask[t]
+        if best_bid[t] > 0:
+            # sell up to the volume at the best bid
+            np.maximum(wanted, -bid_volume[t], out=traded)
+            np.minimum(traded, 0, out=traded)
+            position += traded
+            paid -= traded * best_bid[t]
+        positions[t] = position
+        cash[t] = paid
+    return positions.T, cash.T
+
+
+class VectorResult:
+    # pnl[p, t] is the total over all symbols of parameter set p after timestamp t
+    def __init__(self, params: dict[str, np.ndarray], symbols: list[str], times: np.ndarray, pnl: np.ndarray, final_by_symbol: np.ndarray):
+        self.params = params
+        self.symbols = symbols
+        self.times = times
+        self.pnl = pnl
+        self.final_by_symbol = final_by_symbol
+
+    @property
+    def final(self) -> np.ndarray:
+        return self.pnl[:, -1]
+
+    def table(self) -> pd.DataFrame:
+        frame = pd.DataFrame(self.params)
+        for s, symbol in enumerate(self.symbols):
+            frame[symbol] = self.final_by_symbol[:, s]
+        frame['TOTAL'] = self.final
+        # worst drop from a running high of the pnl curve
+        frame['max_drawdown'] = (np.maximum.accumulate(self.pnl, axis=1) - self.pnl).max(axis=1)
+        return frame
+
+    def top(self, n=10) -> pd.DataFrame:
+        return self.table().sort_values('TOTAL', ascending=False).head(n)
+
+    def best_params(self, n=10) -> list[dict]:
+        order = np.argsort(-self.final, kind='stable')[:n]
+        return [{ name: values[p].item() for name, values in self.params.items() } for p in order]
+
+
+def run_vector(strategy: Callable, round: int, day: int, symbols: list[str] | None, params: dict[str, np.ndarray],
+               time_limit=999900, names=True, data: tuple[DayPrices, DayTrades] | None = None, chunk=500) -> VectorResult:
+    # `symbols` None means all positionable symbols of the round. Parameter
+    # sets are run `chunk` at a time, a chunk needs a few (chunk, T) arrays.
+    # `data` is cut to `time_limit` like simulate_alternative does
+    if data is None:
+        prices, trades = load_day(round, day, names, time_limit)
+    else:
+        prices = slice_prices(data[0], time_limit)
+        trades = slice_trades(data[1], time_limit)
+    if symbols is None:
+        symbols = [symbol for symbol in SYMBOLS_BY_ROUND_POSITIONABLE[round] if symbol in prices.symbols]
+    arrays = market_arrays(prices, trades, symbols)
+    n = len(next(iter(params.values()))) if params else 1
+    times = next(iter(arrays.values())).times
+    pnl = np.zeros((n, len(times)))
+    final_by_symbol = np.zeros((n, len(symbols)))
+    for start in range(0, n, chunk):
+        end = min(start + chunk, n)
+        columns = _columns({ name: np.asarray(values)[start:end] for name, values in params.items() })
+        for s, symbol in enumerate(symbols):
+            m = arrays[symbol]
+            targets = np.broadcast_to(strategy(m, columns), (end - start, len(times)))
+            positions, cash = fill_targets(m, targets, current_limits[symbol])
+            symbol_pnl = cash + positions * m.mid
+            pnl[start:end] += symbol_pnl
+            final_by_symbol[start:end, s] = symbol_pnl[:, -1]
+    return VectorResult(params, symbols, times, pnl, final_by_symbol)
+
+
+class SignalTrader:
+    # Follows the targets of a vector strategy for one parameter set inside
+    # simulate_alternative, with orders at the top of the book like fill_targets
+    def __init__(self, targets: dict[str, np.ndarray], times: np.ndarray):
+        self.targets = { symbol: values.tolist() for symbol, values in targets.items() }
+        self.index: dict[int, int] = dict(zip(times.tolist(), range(len(times))))
+
+    def run(self, state: TradingState) -> dict[str, list[Order]]:
+        i = self.index[state.timestamp]
+        orders = {}
+        for symbol, targets in self.targets.items():
+            depth = state.order_depths.get(symbol)
+            wanted = targets[i] - state.position.get(symbol, 0)
+            if depth is None or wanted == 0:
+                continue
+            if wanted > 0 and depth.sell_orders:
+                orders[symbol] = [Order(symbol, min(depth.sell_orders), wanted)]
+            elif wanted < 0 and depth.buy_orders:
+                orders[symbol] = [Order(symbol, max(depth.buy_orders), wanted)]
+        return orders
+
+
+def signal_trader(strategy: Callable, params: dict, prices: DayPrices, trades: DayTrades, symbols: list[str]) -> SignalTrader:
+    arrays = market_arrays(prices, trades, symbols)
+    columns = _columns({ name: [value] for name, value in params.items() })
+    targets = {}
+    for symbol, m in arrays.items():
+        raw = np.broadcast_to(strategy(m, columns), (1, len(m.times)))[0]
+        targets[symbol] = np.clip(np.rint(raw), -current_limits[symbol], current_limits[symbol]).astype(np.int64)
+    return SignalTrader(targets, prices.times)
+
+
+def confirm(strategy: Callable, result: VectorResult, round: int, day: int, symbols: list[str] | None = None, n=5,
+            time_limit=999900, names=True, **kwargs) -> pd.DataFrame:
+    # runs the n best parameter sets through simulate_alternative and puts
+    # their PnL next to the one of the vector engine
+    data = load_day(round, day, names, time_limit)
+    symbols = symbols or result.symbols
+    rows = []
+    for params in result.best_params(n):
+        trader = signal_trader(strategy, params, *data, symbols)
+        ledger = simulate_alternative(round, day, trader, time_limit, names, data=data, **{'log': False, **kwargs})
+        p = int(np.flatnonzero(np.all([result.params[name] == value for name, value in params.items()], axis=0))[0])
+        rows.append({**params, 'vector_pnl': result.final[p], 'simulated_pnl': ledger.total()})
+    return pd.DataFrame(rows)